@@ -0,0 +1,333 @@
+import asyncio
+import contextvars
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+from app.config import BUSINESS_ID, PACKAGE_FEATURES, PACKAGE_TYPE
+from app.tenants import business_exists, list_businesses
+from app.startup import readiness, start_background_warmup
+from ingestion.jobs import get_ingest_queue
+from rag.cache import get_answer_cache
+from rag.chain import gate_stats
+from rag.coordinator import BUSY_MESSAGE, Overloaded, get_coordinator
+from rag.llm_factory import get_provider_pool
+from rag.registry import get_registry
+from rag.service import answer_query, stream_answer
+from utils.tracing import export_prometheus
+
+# ===============================
+# SERVING LIMITS
+# ===============================
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "32"))
+API_REQUEST_TIMEOUT_S = float(os.getenv("API_REQUEST_TIMEOUT_S", "30"))
+
+
+class AdmissionController:
+    """
+    Bounds the worker threads that run blocking RAG work.
+
+    Waiting in line, fairness across businesses and sharing of identical
+    questions happen in the request coordinator; here a request either gets
+    a thread straight away or is rejected, so the API never builds a
+    backlog of its own. A slot is only released when its worker thread
+    actually finishes, so timed-out requests still count against capacity
+    until they stop.
+    """
+
+    def __init__(self, max_inflight: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="rag")
+        self._limit = max_inflight
+        self.pending = 0
+
+    def acquire(self):
+        if self.pending >= self._limit:
+            raise Overloaded("All API workers are busy")
+        self.pending += 1
+
+    def release(self, _=None):
+        self.pending -= 1
+
+    async def run(self, fn, *args, timeout: float):
+        loop = asyncio.get_running_loop()
+
+        self.acquire()
+        future = loop.run_in_executor(self.executor, fn, *args)
+        future.add_done_callback(self.release)
+
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+
+app = FastAPI(title="RAG Business Chatbot API")
+admission = None
+
+
+class QueryRequest(BaseModel):
+    query: str
+    role: str = "user"
+    business_id: str = BUSINESS_ID
+    stream: bool = False
+
+
+def _check_business(business_id: str):
+    if not business_exists(business_id):
+        raise HTTPException(status_code=404, detail=f"Unknown business: {business_id}")
+
+
+def _check_admin(role: str, password: str | None):
+    if role != "admin":
+        return
+    expected = os.getenv("ADMIN_PASSWORD")
+    # Without a configured password admin access is off, not open
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin access is not configured")
+    if password is None or not hmac.compare_digest(password.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin password")
+
+
+def _overloaded():
+    return HTTPException(
+        status_code=503,
+        detail=BUSY_MESSAGE,
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.on_event("startup")
+async def startup():
+    global admission
+    # Coordinator slots plus its queue, so every admitted request has a thread
+    admission = AdmissionController(API_MAX_CONCURRENCY + API_MAX_QUEUE)
+
+    # Warm the shared embedding model and default tenant without holding up
+    # the server; /ready reports when that is done
+    start_background_warmup(BUSINESS_ID)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "startup": readiness(),
+        "package": PACKAGE_TYPE,
+        "businesses": list_businesses(),
+        "pending_requests": admission.pending if admission else 0,
+        "coordinator": get_coordinator().stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "vector_stores": get_registry().stats(),
+        "llm_providers": get_provider_pool().stats(),
+        "retrieval_gate": gate_stats(),
+    }
+
+
+@app.get("/ready")
+async def ready():
+    status = readiness()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status, headers={"Retry-After": "1"})
+    return status
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return export_prometheus()
+
+
+_DONE = object()
+
+
+def _step(context: contextvars.Context, tokens):
+    # Every step of one answer runs in the same Context, whichever worker
+    # thread takes it, so its trace stays current until the stream ends
+    return context.run(next, tokens, _DONE)
+
+
+class _AnswerStream:
+    """
+    One streamed answer and the admission slot it holds.
+
+    Steps run one at a time in the answer's own Context. `close` may come
+    from the body generator, the response's background task or a failed
+    first token; whichever is first stops the stream, and the slot is
+    released once the step still running (if any) has finished.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.context = contextvars.copy_context()
+        self._step = None
+        self._closed = False
+        self._released = False
+
+    def step(self, timeout: float):
+        loop = asyncio.get_running_loop()
+        self._step = loop.run_in_executor(admission.executor, _step, self.context, self.tokens)
+        self._step.add_done_callback(self._step_done)
+        # Shielded, so a timeout leaves the step future pending until its
+        # worker thread actually returns
+        return asyncio.wait_for(asyncio.shield(self._step), timeout)
+
+    def _step_done(self, _):
+        self._step = None
+        if self._closed:
+            self._release()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._step is None:
+            self._release()
+
+    def _release(self):
+        if self._released:
+            return
+        self._released = True
+        # Close the answer generator in its context so its trace is reset
+        # and written
+        try:
+            self.context.run(self.tokens.close)
+        except Exception as e:
+            print(f"⚠️ Closing answer stream failed: {e}")
+        admission.release()
+
+
+async def _stream_tokens(stream: _AnswerStream, first: str, deadline: float):
+    loop = asyncio.get_running_loop()
+
+    try:
+        if first is not _DONE:
+            yield first
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            token = await stream.step(remaining)
+            if token is _DONE:
+                break
+            yield token
+    finally:
+        stream.close()
+
+
+@app.post("/query")
+async def query(request: QueryRequest, x_admin_password: str | None = Header(default=None)):
+    _check_business(request.business_id)
+    _check_admin(request.role, x_admin_password)
+
+    if request.stream:
+        loop = asyncio.get_running_loop()
+        try:
+            admission.acquire()
+        except Overloaded:
+            raise _overloaded()
+
+        deadline = loop.time() + API_REQUEST_TIMEOUT_S
+        stream = _AnswerStream(stream_answer(request.business_id, request.role, request.query))
+        # Wait for the first token before sending headers, so a shed request
+        # still gets a proper 503
+        try:
+            first = await stream.step(API_REQUEST_TIMEOUT_S)
+        except BaseException as e:
+            stream.close()
+            if isinstance(e, Overloaded):
+                raise _overloaded()
+            if isinstance(e, asyncio.TimeoutError):
+                raise HTTPException(status_code=504, detail="Answer generation timed out")
+            if isinstance(e, FileNotFoundError):
+                raise HTTPException(status_code=404, detail=str(e))
+            raise
+
+        # The background task covers a body that is never iterated, e.g. when
+        # the client is gone before the response starts
+        return StreamingResponse(
+            _stream_tokens(stream, first, deadline),
+            media_type="text/plain",
+            background=BackgroundTask(stream.close)
+        )
+
+    try:
+        answer = await admission.run(
+            answer_query,
+            request.business_id,
+            request.role,
+            request.query,
+            timeout=API_REQUEST_TIMEOUT_S
+        )
+    except Overloaded:
+        raise _overloaded()
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Answer generation timed out")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"answer": answer}
+
+
+@app.post("/ingest")
+async def ingest(
+    files: list[UploadFile] = File(...),
+    access: str = Form("admin"),
+    business_id: str = Form(BUSINESS_ID),
+    wait: bool = Form(True),
+    x_admin_password: str | None = Header(default=None)
+):
+    _check_business(business_id)
+    _check_admin("admin", x_admin_password)
+
+    if access not in ("public", "admin"):
+        raise HTTPException(status_code=400, detail="access must be 'public' or 'admin'")
+
+    uploads = []
+    for upload in files:
+        data = await upload.read()
+        uploads.append(SimpleNamespace(name=upload.filename, read=lambda d=data: d))
+
+    max_docs = PACKAGE_FEATURES[PACKAGE_TYPE]["max_docs"]
+    try:
+        # Serialized with every other writer of this business
+        job = get_ingest_queue().submit(business_id, access, uploads, max_docs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not wait:
+        return JSONResponse(status_code=202, content={"job": job.as_dict()})
+
+    await asyncio.get_running_loop().run_in_executor(None, job.wait)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    return {"ingested": len(uploads), "report": job.report, "job": job.as_dict()}
+
+
+@app.get("/ingest/jobs")
+def ingest_jobs(
+    business_id: str = BUSINESS_ID,
+    x_admin_password: str | None = Header(default=None)
+):
+    _check_business(business_id)
+    _check_admin("admin", x_admin_password)
+    return {"jobs": get_ingest_queue().jobs(business_id)}
+
+
+def run():
+    import uvicorn
+
+    if not PACKAGE_FEATURES[PACKAGE_TYPE]["api"]:
+        raise SystemExit(f"API access is not included in the '{PACKAGE_TYPE}' package.")
+
+    uvicorn.run(
+        app,
+        host=os.getenv("API_HOST", "0.0.0.0"),
+        port=int(os.getenv("API_PORT", "8000"))
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -3,26 +3,27 @@ from app.config import PACKAGE_FEATURES, PACKAGE_TYPE
 import os
 
 def logout(preserve_chat=True):
-    # Save current role's chat history before clearing
-    if preserve_chat and "role" in st.session_state:
+    # Save current role's conversation (history + summary) before clearing
+    if preserve_chat and "role" in st.session_state and "memory" in st.session_state:
         current_role = st.session_state.role
-        chat_history = st.session_state.get("chat_history", [])
-        
+        memory = st.session_state.memory
+
         # Store in role-specific key
         if current_role == "admin":
-            st.session_state.admin_chat_history = chat_history
+            st.session_state.admin_memory = memory
         else:
-            st.session_state.user_chat_history = chat_history
+            st.session_state.user_memory = memory
 
     # Clear session state
-    admin_chat = st.session_state.get("admin_chat_history", [])
-    user_chat = st.session_state.get("user_chat_history", [])
+    admin_memory = st.session_state.get("admin_memory")
+    user_memory = st.session_state.get("user_memory")
     
     # ✅ Remove ONLY auth-related keys
     keys_to_remove = [
         "logged_in",
         "role",
-        "chat_history",
+        "memory",
+        "history_pages",
         "is_admin",
         "admin_logged_in",
         "admin_user",
@@ -33,10 +34,10 @@ def logout(preserve_chat=True):
         if key in st.session_state:
             del st.session_state[key]
     
-    # Restore role-specific chat histories
+    # Restore role-specific conversations
     if preserve_chat:
-        st.session_state.admin_chat_history = admin_chat
-        st.session_state.user_chat_history = user_chat
+        st.session_state.admin_memory = admin_memory
+        st.session_state.user_memory = user_memory
 
     st.rerun()
 
@@ -63,11 +64,14 @@ def login():
                 st.session_state.role = role
                 st.session_state.logged_in = True
                 
-                # Load role-specific chat history
-                if role == "admin":
-                    st.session_state.chat_history = st.session_state.get("admin_chat_history", [])
+                # Load role-specific conversation; without a saved one, drop
+                # whatever chat came before login so get_memory starts fresh
+                memory = st.session_state.get(f"{role}_memory")
+                if memory is not None:
+                    st.session_state.memory = memory
                 else:
-                    st.session_state.chat_history = st.session_state.get("user_chat_history", [])
+                    st.session_state.pop("memory", None)
+                st.session_state.pop("history_pages", None)
                 
                 st.success(f"Logged in as {role}")
                 st.rerun()
@@ -36,5 +36,5 @@ PACKAGE_FEATURES = {
 # ===============================
 # DEMO BUSINESS CONFIG 
 # ===============================
-BUSINESS_ID = "urban_threadz"
+BUSINESS_ID = os.getenv("BUSINESS_ID", "urban_threadz")  # default tenant; the API serves any business folder
 PACKAGE_TYPE = "standard"  # change to basic / standard / premium
@@ -1,54 +1,51 @@
-import os
 import streamlit as st
 
 from app.auth import login
-from app.ui import render_chat_ui, add_message, load_business_config, show_splash_screen
+from app.ui import (
+    render_chat_ui, add_message, get_memory, load_business_config, show_splash_screen,
+    render_streaming_answer, render_readiness
+)
+from app.startup import readiness, start_background_warmup
 from app.config import BUSINESS_ID, PACKAGE_FEATURES, PACKAGE_TYPE
 
-from ingestion.ingest import ingest_files
-from rag.retriever import get_retriever
-from rag.chain import build_rag_chain, run_rag
+from ingestion.jobs import get_ingest_queue
+from rag.registry import get_registry
+from rag.cache import get_answer_cache
+from rag.chain import gate_stats
+from rag.coordinator import BUSY_MESSAGE, Overloaded, get_coordinator
+from rag.faq import get_faq_store
+from rag.llm_factory import get_provider_pool
+from rag.service import answer_query, stream_answer
 from utils.error_handler import handle_error
 
-from types import SimpleNamespace
-
-def auto_ingest_existing_docs():
-    base_path = f"businesses/{BUSINESS_ID}"
-
-    for access in ["public", "admin"]:
-        docs_path = os.path.join(base_path, f"{access}_docs")
-        if not os.path.exists(docs_path):
-            continue
-
-        files = []
-        for filename in os.listdir(docs_path):
-            if not filename.lower().endswith((".pdf", ".txt", ".docx")):
-                continue
-
-            file_path = os.path.join(docs_path, filename)
-            files.append(
-                SimpleNamespace(
-                    name=filename,
-                    read=lambda fp=file_path: open(fp, "rb").read()
-                )
-            )
-        if files:
-            ingest_files(files, BUSINESS_ID, access)
-
-
 def real_rag_answer(query, role):
     try:
-        retriever = get_retriever(BUSINESS_ID, role)
-        return run_rag(retriever, query)
+        return answer_query(BUSINESS_ID, role, query)
+    except Overloaded:
+        return BUSY_MESSAGE
     except Exception as e:
         handle_error(e)
         return "I couldn't process that request right now."
 
 
+def stream_rag_answer(query, role):
+    try:
+        yield from stream_answer(BUSINESS_ID, role, query)
+    except Overloaded:
+        yield BUSY_MESSAGE
+    except Exception as e:
+        handle_error(e)
+        yield "I couldn't process that request right now."
+
+
 def run_app():
     
     st.set_page_config(page_title="RAG Business Chatbot", layout="centered")
 
+    # Once per process: model warm-up, document sync and index load run in
+    # the background while sessions render
+    start_background_warmup(BUSINESS_ID)
+
     business_config = load_business_config(BUSINESS_ID)
 
     # ---- Session defaults (TOP of main.py) ----
@@ -74,17 +71,12 @@ def run_app():
 
 
     # ---- SPLASH ANIMATION (ONCE) ----
+    # Plays client-side over the app while it renders underneath
     if st.session_state.app_phase == "splash":
         show_splash_screen(business_config)
         st.session_state.app_phase = "app"
-        st.rerun()
-
-        
-    # Auto-ingest once per session
-    if "auto_ingested" not in st.session_state:
-        auto_ingest_existing_docs()
-        st.session_state.auto_ingested = True
 
+    render_readiness(readiness())
 
     login()
     role = st.session_state.get("role", "user")
@@ -103,29 +95,76 @@ def run_app():
             accept_multiple_files=True
         )
 
-        if uploaded_files:
+        # The uploader keeps its files across reruns; queue each set once
+        upload_key = tuple((f.name, f.size) for f in uploaded_files or [])
+        if uploaded_files and st.session_state.get("queued_upload") != upload_key:
             try:
-                ingest_files(
-                    uploaded_files,
+                job = get_ingest_queue().submit(
                     BUSINESS_ID,
                     "admin",
+                    uploaded_files,
                     features["max_docs"]
                 )
-                st.success(f"{len(uploaded_files)} document(s) ingested successfully.")
+                st.session_state.queued_upload = upload_key
+                st.success(f"{len(uploaded_files)} document(s) queued for ingestion (job {job.id}).")
             except Exception as e:
                 handle_error(e)
 
+        with st.expander("🗂️ Ingestion jobs"):
+            if st.button("🔄 Refresh"):
+                st.rerun()
+            jobs = get_ingest_queue().jobs(BUSINESS_ID)
+            if jobs:
+                st.dataframe(
+                    [
+                        {
+                            "job": job["id"],
+                            "access": job["access"],
+                            "files": len(job["files"]),
+                            "status": job["status"],
+                            "merged_into": job["merged_into"],
+                            "error": job["error"],
+                        }
+                        for job in jobs
+                    ],
+                    use_container_width=True
+                )
+            else:
+                st.caption("No ingestion jobs yet.")
+
+        with st.expander("📈 Performance stats"):
+            st.json({
+                "coordinator": get_coordinator().stats(),
+                "answer_cache": get_answer_cache().stats(),
+                "vector_stores": get_registry().stats(),
+                "llm_providers": get_provider_pool().stats(),
+                "retrieval_gate": gate_stats(),
+                "faq_store": get_faq_store(BUSINESS_ID).stats(),
+            })
+
     # ===============================
     # CHAT SECTION
     # ===============================
     query = render_chat_ui(business_config)
 
     if query:
+        # Follow-ups ("what about in blue?") are rewritten into standalone
+        # questions before retrieval
+        try:
+            standalone = get_memory().condense(query)
+        except Overloaded:
+            standalone = None
+
         add_message("user", query)
-        
-        with st.spinner("🤔 Thinking..."):
-            answer = real_rag_answer(query, role)
-        
+        with st.chat_message("user"):
+            st.markdown(query)
+            if standalone is not None and standalone != query:
+                st.caption(f"🔎 Searching for: {standalone}")
+
+        # Tokens are rendered as they arrive instead of behind a spinner
+        tokens = stream_rag_answer(standalone, role) if standalone is not None else iter([BUSY_MESSAGE])
+        answer = render_streaming_answer(tokens)
+
         add_message("assistant", answer)
         st.rerun()  # ✅ CRITICAL: Force UI refresh to show new messages
 
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+import traceback
+from types import SimpleNamespace
+
+from app.config import BUSINESS_ID
+from ingestion.embedder import get_embeddings
+from ingestion.jobs import get_ingest_queue
+from rag.registry import get_registry
+
+# Startup phases, in order
+PHASES = ("starting", "warming_model", "syncing_documents", "loading_index", "ready")
+
+_state = {"phase": "starting", "error": None, "started_at": None, "timings": {}}
+_state_lock = threading.Lock()
+_started = False
+
+
+def _set_phase(phase: str):
+    with _state_lock:
+        _state["phase"] = phase
+
+
+def readiness() -> dict:
+    """Snapshot of the background startup: phase, per-phase seconds, error."""
+    with _state_lock:
+        snapshot = {**_state, "timings": dict(_state["timings"])}
+    snapshot["ready"] = snapshot["phase"] == "ready"
+    if snapshot["started_at"] is not None:
+        snapshot["uptime_s"] = round(time.time() - snapshot["started_at"], 3)
+    return snapshot
+
+
+def auto_ingest_existing_docs(business_id: str = BUSINESS_ID) -> list:
+    """Queue a sync of businesses/<id>/{public,admin}_docs; returns the jobs."""
+    base_path = f"businesses/{business_id}"
+
+    jobs = []
+    for access in ["public", "admin"]:
+        docs_path = os.path.join(base_path, f"{access}_docs")
+        if not os.path.exists(docs_path):
+            continue
+
+        files = []
+        for filename in os.listdir(docs_path):
+            if not filename.lower().endswith((".pdf", ".txt", ".docx")):
+                continue
+
+            file_path = os.path.join(docs_path, filename)
+            files.append(
+                SimpleNamespace(
+                    name=filename,
+                    path=file_path,
+                    read=lambda fp=file_path: open(fp, "rb").read()
+                )
+            )
+        # Unchanged files are skipped via the manifest; deleted ones are purged.
+        # Queued behind any running ingest so sessions never write at once
+        jobs.append(get_ingest_queue().submit(business_id, access, files, prune_missing=True))
+    return jobs
+
+
+def _timed(phase: str, fn):
+    _set_phase(phase)
+    started = time.perf_counter()
+    result = fn()
+    with _state_lock:
+        _state["timings"][phase] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _warm_up(business_id: str, sync_documents: bool):
+    try:
+        _timed("warming_model", lambda: get_embeddings().embed_query("warm up"))
+
+        if sync_documents:
+            def sync():
+                for job in auto_ingest_existing_docs(business_id):
+                    job.wait()
+                    if job.status == "failed":
+                        print(f"[WARN] Startup sync of {business_id}/{job.access} failed: {job.error}")
+            _timed("syncing_documents", sync)
+
+        def load():
+            registry = get_registry()
+            for access in ("public", "admin"):
+                if registry.exists(business_id, access):
+                    registry.get_partition(business_id, access)
+        _timed("loading_index", load)
+
+        _set_phase("ready")
+        print(f"✅ Ready in {readiness()['uptime_s']}s: {readiness()['timings']}")
+    except Exception as e:
+        traceback.print_exc()
+        with _state_lock:
+            _state["phase"] = "failed"
+            _state["error"] = str(e)
+
+
+def start_background_warmup(business_id: str = BUSINESS_ID, sync_documents: bool = True):
+    """
+    Load the embedding model, sync the business's documents and load its
+    index on a background thread, once per process. Returns immediately;
+    poll `readiness()` for progress.
+    """
+    global _started
+
+    with _state_lock:
+        if _started:
+            return
+        _started = True
+        _state["started_at"] = time.time()
+
+    threading.Thread(
+        target=_warm_up, args=(business_id, sync_documents), name="warmup", daemon=True
+    ).start()
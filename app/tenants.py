@@ -0,0 +1,46 @@
+import json
+import os
+import threading
+
+BUSINESSES_PATH = "businesses"
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def business_config_path(business_id: str) -> str:
+    return os.path.join(BUSINESSES_PATH, business_id, "business.json")
+
+
+def list_businesses() -> list[str]:
+    """Every business folder that has a business.json."""
+    if not os.path.isdir(BUSINESSES_PATH):
+        return []
+    return sorted(
+        name for name in os.listdir(BUSINESSES_PATH)
+        if os.path.isfile(business_config_path(name))
+    )
+
+
+def business_exists(business_id: str) -> bool:
+    # Guard against path traversal through a client-supplied id
+    return os.path.basename(business_id) == business_id and os.path.isfile(
+        business_config_path(business_id)
+    )
+
+
+def load_business_config(business_id: str) -> dict:
+    """Load business.json once and re-read it only when the file changes."""
+    path = business_config_path(business_id)
+    mtime = os.path.getmtime(path)
+
+    cached = _configs.get(business_id)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    with _configs_lock:
+        _configs[business_id] = (mtime, config)
+    return config
@@ -1,13 +1,18 @@
+import os
 import streamlit as st
-import json
 from pathlib import Path
-import time
 import base64
 
+from app import tenants
+from app.config import BUSINESS_ID
+from app.startup import PHASES
+from rag.memory import ConversationMemory
+
+# Messages rendered per page of chat history; older pages load on demand
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+
 def load_business_config(business_id: str):
-    path = Path(f"businesses/{business_id}/business.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return tenants.load_business_config(business_id)
 
 def get_audio_base64(audio_path):
     """Convert audio file to base64 for HTML embedding"""
@@ -19,7 +24,13 @@ def get_audio_base64(audio_path):
         return None
 
 def show_splash_screen(business_config):
-    """Show animated splash screen with logo morphing effect (NO SOUND)"""
+    """
+    Show animated splash screen with logo morphing effect (NO SOUND).
+
+    The animation runs entirely in the browser as an overlay that fades out
+    and stops taking clicks on its own, so the app renders underneath
+    instead of the server sleeping through it.
+    """
 
     branding = business_config.get("branding", {})
     logo_url = branding.get("logo_url")
@@ -37,11 +48,6 @@ def show_splash_screen(business_config):
 
     splash_html = f"""
     <style>
-        /* Hide all Streamlit elements during splash */
-        [data-testid="stAppViewContainer"] > section {{
-            opacity: 0;
-        }}
-
         @keyframes popIn {{
             0% {{
                 opacity: 0;
@@ -85,9 +91,11 @@ def show_splash_screen(business_config):
         @keyframes fadeOut {{
             0% {{
                 opacity: 1;
+                visibility: visible;
             }}
             100% {{
                 opacity: 0;
+                visibility: hidden;
             }}
         }}
 
@@ -138,31 +146,9 @@ def show_splash_screen(business_config):
             <img src="data:image/png;base64,{logo_base64}" class="splash-logo" alt="Logo">
         </div>
     </div>
-
-    <script>
-        (function() {{
-            setTimeout(function() {{
-                var splash = document.getElementById('splashScreen');
-                var appContent = document.querySelector('[data-testid="stAppViewContainer"] > section');
-
-                if (splash) {{
-                    splash.remove();
-                }}
-                if (appContent) {{
-                    appContent.style.opacity = '1';
-                    appContent.style.transition = 'opacity 0.3s ease-in';
-                }}
-            }}, 6400);
-        }})();
-    </script>
     """
 
-    placeholder = st.empty()
-    with placeholder.container():
-        st.markdown(splash_html, unsafe_allow_html=True)
-
-    time.sleep(6.5)  # keep timing exactly as requested
-    placeholder.empty()
+    st.markdown(splash_html, unsafe_allow_html=True)
 
     
 def render_chat_ui(business_config):
@@ -233,17 +219,61 @@ def render_chat_ui(business_config):
             unsafe_allow_html=True
         )
 
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    if "history_pages" not in st.session_state:
+        st.session_state.history_pages = 1
+
+    # Only the newest page(s) are rendered, so long sessions rerun quickly
+    messages, hidden = get_memory().page(st.session_state.history_pages, HISTORY_PAGE_SIZE)
+    if hidden and st.button(f"⬆️ Show earlier messages ({hidden})"):
+        st.session_state.history_pages += 1
+        st.rerun()
 
-    for msg in st.session_state.chat_history:
+    for msg in messages:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
     return st.chat_input("Ask a question about the business...")
 
+def get_memory() -> ConversationMemory:
+    """This session's conversation memory (history, summary, condensed queries)."""
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory(BUSINESS_ID)
+    return st.session_state.memory
+
 def add_message(role, content):
-    st.session_state.chat_history.append({
-        "role": role,
-        "content": content
-    })
+    get_memory().add(role, content)
+
+def render_readiness(status):
+    """Startup progress from app.startup.readiness(); nothing once ready."""
+    if status["ready"]:
+        return
+
+    if status["phase"] == "failed":
+        st.warning(f"⚠️ Background startup failed: {status['error']}")
+        return
+
+    labels = {
+        "starting": "Starting up",
+        "warming_model": "Loading the embedding model",
+        "syncing_documents": "Syncing business documents",
+        "loading_index": "Loading the knowledge base",
+    }
+    step = PHASES.index(status["phase"])
+    st.progress(step / (len(PHASES) - 1), text=f"⏳ {labels[status['phase']]}… answers may be slower until ready.")
+    if st.button("🔄 Check again"):
+        st.rerun()
+
+def render_streaming_answer(token_stream):
+    """Render assistant tokens as they arrive and return the full answer"""
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        placeholder.markdown("🤔 Thinking...")
+
+        answer = ""
+        for token in token_stream:
+            answer += token
+            placeholder.markdown(answer + "▌")
+
+        placeholder.markdown(answer)
+
+    return answer
@@ -0,0 +1,230 @@
+"""
+End-to-end RAG benchmark on a synthetic corpus.
+
+    python -m benchmarks.run --chunks 5000 --embeddings minilm --output bench_output.txt
+
+Runs in a scratch directory (businesses/ and vector_db/ are relative
+paths), so the real tenants are never touched. Measures ingestion
+throughput, cold/warm vector store loads, retrieval latency percentiles,
+recall@k against exact search and full-pipeline latency with a local
+stub LLM, and emits one JSON document for regression tracking.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import faiss
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUSINESS_ID = "bench_co"
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _disk_files(docs_path: str):
+    return [
+        SimpleNamespace(name=name, path=os.path.join(docs_path, name))
+        for name in sorted(os.listdir(docs_path))
+    ]
+
+
+def bench_ingestion(ingest_files) -> dict:
+    results = {}
+    for access in ("public", "admin"):
+        docs_path = os.path.join("businesses", BUSINESS_ID, f"{access}_docs")
+        if not os.path.isdir(docs_path):
+            continue
+        files = _disk_files(docs_path)
+
+        started = time.perf_counter()
+        report = ingest_files(files, BUSINESS_ID, access, prune_missing=True)
+        cold = time.perf_counter() - started
+
+        # A second pass must be a no-op thanks to the manifest
+        started = time.perf_counter()
+        ingest_files(files, BUSINESS_ID, access, prune_missing=True)
+        warm = time.perf_counter() - started
+
+        results[access] = {"cold_s": round(cold, 3), "warm_noop_s": round(warm, 3), "stages": report}
+    return results
+
+
+def bench_loads(registry) -> dict:
+    registry.invalidate()
+    started = time.perf_counter()
+    registry.get(BUSINESS_ID, "public")
+    cold = time.perf_counter() - started
+
+    warm = []
+    for _ in range(100):
+        started = time.perf_counter()
+        registry.get(BUSINESS_ID, "public")
+        warm.append(time.perf_counter() - started)
+
+    return {"cold_load_s": round(cold, 3), "warm_get": percentiles(warm)}
+
+
+def bench_retrieval(get_retriever, questions: list[dict], k: int) -> dict:
+    results = {}
+    for role in ("user", "admin"):
+        latencies = []
+        source_hits = 0
+        for q in questions:
+            started = time.perf_counter()
+            docs = get_retriever(BUSINESS_ID, role).invoke(q["question"])
+            latencies.append(time.perf_counter() - started)
+            source_hits += any(doc.metadata.get("source") == q["source"] for doc in docs[:k])
+
+        results[role] = {
+            "latency": percentiles(latencies),
+            f"source_hit@{k}": round(source_hits / len(questions), 4) if questions else None,
+        }
+    return results
+
+
+def bench_recall(registry, embeddings, questions: list[dict], k: int) -> dict:
+    """recall@k of the configured index against exact flat search."""
+    from ingestion.index_builder import index_type_of, stored_vectors
+
+    store = registry.get(BUSINESS_ID, "public")
+    vectors = stored_vectors(store, embeddings)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+
+    queries = np.asarray(
+        embeddings.embed_documents([q["question"] for q in questions]), dtype="float32"
+    )
+    _, truth = exact.search(queries, k)
+    _, found = store.index.search(queries, k)
+
+    recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+    return {"index_type": index_type_of(store.index), f"recall@{k}": round(float(recall), 4)}
+
+
+def bench_pipeline(answer_query, cache, questions: list[dict]) -> dict:
+    cache.clear()
+    cold = []
+    for q in questions:
+        started = time.perf_counter()
+        answer_query(BUSINESS_ID, "user", q["question"])
+        cold.append(time.perf_counter() - started)
+
+    cached = []
+    for q in questions:
+        started = time.perf_counter()
+        answer_query(BUSINESS_ID, "user", q["question"])
+        cached.append(time.perf_counter() - started)
+
+    return {"uncached": percentiles(cold), "cached": percentiles(cached)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000, help="approximate corpus size in chunks")
+    parser.add_argument("--admin-ratio", type=float, default=0.3)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--index-type", default="flat", help="flat | hnsw | ivf | ivfpq | sq8")
+    parser.add_argument(
+        "--embeddings", default="minilm",
+        help="minilm (local sentence-transformers cache) or hash (deterministic stub, for scale runs)"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM seconds per streamed char")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="scratch directory (default: a fresh temp dir)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+
+    from benchmarks.synthetic import generate_business
+    from ingestion import embedder
+    from ingestion.ingest import ingest_files
+    from rag import llm_factory
+    from rag.cache import get_answer_cache
+    from rag.registry import get_registry
+    from rag.retriever import get_retriever
+    from rag.service import answer_query
+
+    if args.embeddings == "hash":
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        embedder.set_embeddings(DeterministicFakeEmbedding(size=384))
+
+    # Local stub LLM so results measure our pipeline, not the provider
+    llm_factory.LLM_PROVIDER = "fake"
+    llm_factory.FAKE_LLM_SLEEP = args.llm_latency
+
+    started = time.perf_counter()
+    questions = generate_business(
+        workdir, BUSINESS_ID, args.chunks, args.admin_ratio,
+        index_spec={"type": args.index_type}, seed=args.seed
+    )
+    random.Random(args.seed).shuffle(questions)
+    questions = questions[:args.queries]
+    if not questions:
+        raise SystemExit("Corpus too small to sample questions; raise --chunks.")
+    generate_seconds = time.perf_counter() - started
+
+    embeddings = embedder.get_embeddings()
+    registry = get_registry()
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+            "questions": len(questions),
+            "generate_s": round(generate_seconds, 3),
+        },
+        "ingestion": bench_ingestion(ingest_files),
+        "vector_store_load": bench_loads(registry),
+        "retrieval": bench_retrieval(get_retriever, questions, args.k),
+        "recall": bench_recall(registry, embeddings, questions, args.k),
+        "pipeline": bench_pipeline(answer_query, get_answer_cache(), questions),
+    }
+
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"✅ Benchmark results written to {output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
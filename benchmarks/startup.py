@@ -0,0 +1,148 @@
+"""
+Time-to-first-answer for freshly started processes.
+
+    python -m benchmarks.startup --chunks 1000 --runs 3 --output startup_output.txt
+
+Builds a synthetic business once, then starts a new Python process per run
+and mode:
+
+    cold  the first question is asked as soon as imports finish, paying for
+          the model and index loads inline (the old startup path)
+    warm  the background warm-up starts at boot and the first question is
+          asked once readiness() reports ready
+
+Each run reports import, ready and first/second answer times plus the
+process wall time seen from outside, and the medians are emitted as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUSINESS_ID = "bench_co"
+
+
+def child(args):
+    started = time.perf_counter()
+    sys.path.insert(0, REPO_ROOT)
+
+    from app.startup import readiness, start_background_warmup
+    from ingestion import embedder
+    from rag import llm_factory
+    from rag.service import answer_query
+
+    if args.embeddings == "hash":
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        embedder.set_embeddings(DeterministicFakeEmbedding(size=384))
+    llm_factory.LLM_PROVIDER = "fake"
+    llm_factory.FAKE_LLM_SLEEP = args.llm_latency
+
+    result = {"mode": args.child, "import_s": time.perf_counter() - started}
+
+    if args.child == "warm":
+        start_background_warmup(BUSINESS_ID)
+        while not readiness()["ready"]:
+            if readiness()["phase"] == "failed":
+                raise SystemExit(f"Warm-up failed: {readiness()['error']}")
+            time.sleep(0.005)
+        result["ready_s"] = time.perf_counter() - started
+        result["warmup_phases"] = readiness()["timings"]
+
+    for label, question in (("first", args.questions[0]), ("second", args.questions[1])):
+        asked = time.perf_counter()
+        answer_query(BUSINESS_ID, "user", question)
+        result[f"{label}_answer_s"] = time.perf_counter() - asked
+        if label == "first":
+            result["time_to_first_answer_s"] = time.perf_counter() - started
+
+    print(json.dumps(result))
+
+
+def _run_child(mode: str, args, questions: list[str], workdir: str) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.startup", "--child", mode,
+        "--embeddings", args.embeddings, "--llm-latency", str(args.llm_latency),
+        "--questions", *questions,
+    ]
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "BUSINESS_ID": BUSINESS_ID}
+
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise SystemExit(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_wall_s"] = wall
+    return result
+
+
+def _summary(runs: list[dict]) -> dict:
+    keys = [k for k, v in runs[0].items() if isinstance(v, float)]
+    return {k: round(statistics.median(run[k] for run in runs), 3) for k in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--embeddings", default="minilm", help="minilm or hash")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir")
+    parser.add_argument("--output")
+    parser.add_argument("--child", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--questions", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag_startup_")
+    os.makedirs(workdir, exist_ok=True)
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+
+    from benchmarks.run import _disk_files, _git_commit
+    from benchmarks.synthetic import generate_business
+    from ingestion import embedder
+    from ingestion.ingest import ingest_files
+
+    if args.embeddings == "hash":
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        embedder.set_embeddings(DeterministicFakeEmbedding(size=384))
+
+    questions = generate_business(workdir, BUSINESS_ID, args.chunks, seed=args.seed)
+    if len(questions) < 2:
+        raise SystemExit("Corpus too small to sample questions; raise --chunks.")
+
+    # Index once up front so every run measures boot, not first ingestion
+    for access in ("public", "admin"):
+        docs_path = os.path.join("businesses", BUSINESS_ID, f"{access}_docs")
+        if os.path.isdir(docs_path):
+            ingest_files(_disk_files(docs_path), BUSINESS_ID, access, prune_missing=True)
+
+    # Two different questions: the second shows steady-state latency
+    pair = [questions[0]["question"], questions[1]["question"]]
+    results = {"meta": {"commit": _git_commit(), "args": vars(args)}}
+    for mode in ("cold", "warm"):
+        runs = [_run_child(mode, args, pair, workdir) for _ in range(args.runs)]
+        results[mode] = {"median": _summary(runs), "runs": runs}
+
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"✅ Startup benchmark written to {output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import json
+import os
+import random
+
+PRODUCTS = [
+    "hoodie", "joggers", "tee", "bomber jacket", "cargo pants", "beanie",
+    "denim jacket", "sweatshirt", "track top", "bucket hat", "overshirt",
+]
+COLORS = ["black", "olive", "sand", "navy", "rust", "off-white", "charcoal", "forest"]
+MATERIALS = ["organic cotton", "recycled polyester", "hemp blend", "TENCEL lyocell"]
+POLICIES = [
+    "Returns are accepted within {n} days of delivery with tags attached.",
+    "Standard shipping takes {n} business days within the continental US.",
+    "Orders over ${n} ship free and include carbon-neutral packaging.",
+    "Exchanges for a different size are free for the first {n} days.",
+]
+INTERNAL = [
+    "Q{q} wholesale margin for {sku} was {n}% after freight costs.",
+    "Supplier contract for {sku} renews in {n} months at revised unit cost.",
+    "Inventory reserve for {sku} is {n} units across both warehouses.",
+]
+
+
+def _sku(rng: random.Random) -> str:
+    return f"UT-{rng.randint(0, 99999):05d}"
+
+
+def _public_paragraph(rng: random.Random, sku: str) -> str:
+    product = rng.choice(PRODUCTS)
+    return (
+        f"The {rng.choice(COLORS)} {product} ({sku}) is made from "
+        f"{rng.choice(MATERIALS)} and comes in sizes XS to XXL. "
+        + rng.choice(POLICIES).format(n=rng.randint(5, 90))
+        + f" Care: machine wash cold, hang dry. Fit notes: the {product} runs "
+        + rng.choice(["true to size", "slightly large", "slightly small"]) + "."
+    )
+
+
+def _admin_paragraph(rng: random.Random, sku: str) -> str:
+    return rng.choice(INTERNAL).format(q=rng.randint(1, 4), sku=sku, n=rng.randint(3, 60))
+
+
+def generate_business(root: str, business_id: str, n_chunks: int, admin_ratio: float = 0.3,
+                      chunks_per_file: int = 50, index_spec: dict | None = None,
+                      seed: int = 0) -> list[dict]:
+    """
+    Write businesses/<business_id>/ with synthetic public and admin .txt
+    files totalling roughly `n_chunks` chunks (one ~800 char paragraph
+    block per chunk). Returns labelled questions: each asks about a SKU
+    whose answer lives in a known public file.
+    """
+    rng = random.Random(seed)
+    business_path = os.path.join(root, "businesses", business_id)
+
+    config = {"business_id": business_id, "business_name": "Benchmark Co"}
+    if index_spec:
+        config["vector_index"] = index_spec
+
+    os.makedirs(business_path, exist_ok=True)
+    with open(os.path.join(business_path, "business.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    questions = []
+    n_files = max(1, n_chunks // chunks_per_file)
+
+    for i in range(n_files):
+        access = "admin" if rng.random() < admin_ratio else "public"
+        docs_path = os.path.join(business_path, f"{access}_docs")
+        os.makedirs(docs_path, exist_ok=True)
+        filename = f"doc_{i:06d}.txt"
+
+        blocks = []
+        for _ in range(chunks_per_file):
+            sku = _sku(rng)
+            if access == "admin":
+                block = " ".join(_admin_paragraph(rng, sku) for _ in range(6))
+            else:
+                block = _public_paragraph(rng, sku) + " " + _public_paragraph(rng, sku)
+                if rng.random() < 0.05:
+                    questions.append({
+                        "question": f"What is {sku} made from and how does it fit?",
+                        "source": filename,
+                    })
+            blocks.append(block)
+
+        with open(os.path.join(docs_path, filename), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(blocks))
+
+    return questions
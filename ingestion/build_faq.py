@@ -0,0 +1,191 @@
+"""
+Precompute answers for frequently asked questions into a business's FAQ store.
+
+    python -m ingestion.build_faq urban_threadz --questions faq.txt --concurrency 4 --rps 0.5
+    python -m ingestion.build_faq urban_threadz --from-log queries.jsonl --top 50
+    python -m ingestion.build_faq urban_threadz --stale
+
+Questions come from a file (one per line, or JSONL with "question" and
+optional "role"), from the most frequent questions in a RAG_QUERY_LOG, or,
+with --stale, from stored entries whose index changed since they were
+answered. Each one runs retrieval and generation through rag.chain on a
+thread pool. LLM calls are paced to --rps; a rate-limit error halves the
+pace and retries after a backoff. The pace then recovers as calls succeed.
+Answers are written to vector_db/<business_id>/faq.json, stamped with the
+index version they were generated from.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rag.cache import normalize_query
+from rag.chain import run_rag
+from rag.faq import get_faq_store, mine_questions, update_faq_store
+from rag.llm_factory import ProvidersUnavailable
+from rag.retriever import get_retriever
+
+# Results written to the store at a time, so a long run keeps its progress
+CHECKPOINT_EVERY = 20
+
+MAX_ATTEMPTS = 4
+
+
+def is_rate_limited(error: Exception) -> bool:
+    # Open circuit breakers usually mean the provider is throttling us
+    if isinstance(error, ProvidersUnavailable):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    text = str(error).lower()
+    return status == 429 or "rate limit" in text or "rate_limit" in text or "429" in text
+
+
+class Pacer:
+    """
+    Spaces LLM calls to at most `rps` per second across threads. A rate-limit
+    error halves the rate and pauses everyone; each success wins back a
+    little, up to the configured rate.
+    """
+
+    def __init__(self, rps: float):
+        self.max_rps = rps
+        self.rps = rps
+        self.rate_limited = 0
+        self._next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + 1.0 / self.rps
+        time.sleep(max(0.0, slot - now))
+
+    def on_success(self):
+        with self._lock:
+            self.rps = min(self.max_rps, self.rps * 1.1)
+
+    def on_rate_limit(self, delay_s: float):
+        with self._lock:
+            self.rate_limited += 1
+            self.rps = max(self.max_rps / 16, self.rps / 2)
+            self._next_at = max(self._next_at, time.monotonic() + delay_s)
+
+
+def load_questions(path: str, role: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [{"role": role, **json.loads(line)} for line in lines]
+    return [{"question": line, "role": role} for line in lines]
+
+
+def _dedupe(questions: list[dict]) -> list[dict]:
+    seen = {}
+    for q in questions:
+        seen.setdefault((q["role"], normalize_query(q["question"])), q)
+    return list(seen.values())
+
+
+def answer_question(business_id: str, question: dict, pacer: Pacer, retrievers: dict) -> dict:
+    role = question["role"]
+    # The partitions this run's retriever searches; an ingest during the run
+    # leaves the entry stale
+    version = retrievers[role].index_version
+
+    for attempt in range(MAX_ATTEMPTS):
+        pacer.wait()
+        try:
+            answer = run_rag(retrievers[role], question["question"], role)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == MAX_ATTEMPTS - 1:
+                raise
+            pacer.on_rate_limit(2.0 * 2 ** attempt)
+            continue
+        pacer.on_success()
+        return {**question, "answer": answer, "index_version": version}
+
+
+def build_faq(business_id: str, questions: list[dict], concurrency: int = 4, rps: float = 0.5,
+              force: bool = False) -> dict:
+    started = time.perf_counter()
+    questions = _dedupe(questions)
+
+    store = get_faq_store(business_id)
+    if not force:
+        questions = [
+            q for q in questions
+            if (entry := store.get(q["role"], q["question"])) is None or store.is_stale(entry)
+        ]
+
+    retrievers = {role: get_retriever(business_id, role) for role in {q["role"] for q in questions}}
+    pacer = Pacer(rps)
+    pending, failed = [], []
+    generated = 0
+
+    def flush():
+        batch = list(pending)
+        pending.clear()
+        if batch:
+            update_faq_store(business_id, lambda s: [
+                s.upsert(r["question"], r["role"], r["answer"], r["index_version"]) for r in batch
+            ])
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="faq") as executor:
+        futures = {executor.submit(answer_question, business_id, q, pacer, retrievers): q for q in questions}
+        for future in as_completed(futures):
+            question = futures[future]
+            try:
+                pending.append(future.result())
+                generated += 1
+            except Exception as e:
+                print(f"[WARN] Could not answer '{question['question']}': {e}")
+                failed.append(question["question"])
+            if len(pending) >= CHECKPOINT_EVERY:
+                flush()
+    flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "business_id": business_id,
+        "questions": len(questions),
+        "generated": generated,
+        "failed": failed,
+        "rate_limited": pacer.rate_limited,
+        "elapsed_s": round(elapsed, 2),
+        "answers_per_s": round(generated / elapsed, 3) if elapsed else None,
+        "store": get_faq_store(business_id).stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("business_id")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--questions", help="text file (one per line) or JSONL of questions")
+    source.add_argument("--from-log", help="RAG_QUERY_LOG file to mine the most asked questions from")
+    source.add_argument("--stale", action="store_true", help="regenerate entries whose index changed")
+    parser.add_argument("--top", type=int, default=50, help="questions mined from the log")
+    parser.add_argument("--role", default="user", help="role for questions without one")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=0.5, help="LLM calls per second")
+    parser.add_argument("--force", action="store_true", help="regenerate fresh entries too")
+    args = parser.parse_args()
+
+    if args.questions:
+        questions = load_questions(args.questions, args.role)
+    elif args.from_log:
+        questions = mine_questions(args.from_log, args.business_id, args.top)
+    else:
+        questions = [
+            {"question": e["question"], "role": e["role"]}
+            for e in get_faq_store(args.business_id).stale_entries()
+        ]
+
+    report = build_faq(args.business_id, questions, args.concurrency, args.rps, args.force)
+    print(json.dumps(report, indent=2))
+    print(f"✅ FAQ store for {args.business_id}: {report['generated']} answers written")
+
+
+if __name__ == "__main__":
+    main()
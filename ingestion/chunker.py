@@ -3,6 +3,8 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 def chunk_documents(documents):
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
-        chunk_overlap=150
+        chunk_overlap=150,
+        # Offsets let the context builder merge neighbouring chunks
+        add_start_index=True
     )
     return splitter.split_documents(documents)
@@ -1,6 +1,41 @@
+import os
+import threading
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from ingestion.embedding_backends import SentenceTransformerEmbeddings
+from utils.tracing import span
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# torch (reference), int8 (dynamically quantized) or onnx (ONNX Runtime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
 
 def get_embeddings():
-    return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    """Return the process-wide embedding model, loading it on first use."""
+    global _embeddings
+
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                with span("embedding_model_load", model=EMBEDDING_MODEL_NAME,
+                          backend=EMBEDDING_BACKEND):
+                    _embeddings = SentenceTransformerEmbeddings(
+                        EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND
+                    )
+    return _embeddings
+
+
+def get_reference_embeddings():
+    """The stock LangChain/PyTorch model, used to check backend parity."""
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+
+def set_embeddings(embeddings):
+    """Replace the process-wide model, e.g. with a local stub for benchmarks."""
+    global _embeddings
+
+    with _embeddings_lock:
+        _embeddings = embeddings
@@ -0,0 +1,223 @@
+import os
+import threading
+from concurrent.futures import Future
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Length-sorted batches are capped at this many padded tokens
+EMBED_MAX_BATCH_TOKENS = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "8192"))
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "128"))
+
+# Concurrent query embeddings arriving within this window share one batch
+QUERY_BATCH_WAIT_MS = float(os.getenv("EMBED_QUERY_BATCH_WAIT_MS", "2"))
+QUERY_BATCH_MAX = int(os.getenv("EMBED_QUERY_BATCH_MAX", "32"))
+
+ONNX_MODELS_PATH = os.getenv("EMBEDDING_ONNX_PATH", os.path.join("models", "onnx"))
+
+
+def length_sorted_batches(lengths: list[int], max_tokens: int = EMBED_MAX_BATCH_TOKENS,
+                          max_size: int = EMBED_MAX_BATCH_SIZE) -> list[list[int]]:
+    """
+    Group text positions into batches of similar length, so each batch pads
+    to its own longest text instead of the longest text overall.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, batch = [], []
+    for i in order:
+        # Sorted ascending, so the newest text is the batch's padded length
+        if batch and ((len(batch) + 1) * lengths[i] > max_tokens or len(batch) >= max_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent embed_query calls into one model call.
+
+    The first caller to arrive waits up to QUERY_BATCH_WAIT_MS for others,
+    then runs one batch, which includes its own query. If more queries
+    arrived meanwhile it hands leadership to the caller of the oldest one
+    and returns, so no request thread keeps embedding for others under
+    sustained load. A lone query pays at most the wait.
+    """
+
+    def __init__(self, encode, wait_ms: float = QUERY_BATCH_WAIT_MS, max_batch: int = QUERY_BATCH_MAX):
+        self._encode = encode
+        self.wait_s = wait_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        self._leader = False
+        self._next_leader = None
+
+    def embed(self, text: str) -> list[float]:
+        future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            if self._leader:
+                self._cond.notify_all()
+                # Until our query is embedded, or the leader hands over to us
+                self._cond.wait_for(lambda: future.done() or self._next_leader is future)
+                lead = not future.done()
+                fresh = False
+                if lead:
+                    self._next_leader = None
+            else:
+                self._leader = lead = fresh = True
+
+        if lead:
+            self._run_batch(fresh)
+        return future.result()
+
+    def _run_batch(self, fresh: bool):
+        with self._cond:
+            # A handed-over batch has already waited for company
+            if fresh:
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.wait_s)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+
+        try:
+            vectors = self._encode([text for text, _ in batch])
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(list(map(float, vector)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+
+        with self._cond:
+            if self._pending:
+                self._next_leader = self._pending[0][1]
+            else:
+                self._leader = False
+            self._cond.notify_all()
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    sentence-transformers model with our own batching.
+
+    backend="torch" is the reference model; "int8" applies dynamic int8
+    quantization to its Linear layers; "onnx" exports the transformer once
+    to ONNX_MODELS_PATH and runs it with ONNX Runtime.
+    """
+
+    def __init__(self, model_name: str, backend: str = "torch"):
+        from sentence_transformers import SentenceTransformer
+
+        self.backend = backend
+        # Separate cache namespace: quantized vectors differ slightly
+        self.model_name = model_name if backend == "torch" else f"{model_name}#{backend}"
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.tokenizer = self.model.tokenizer
+        self.max_length = self.model.max_seq_length
+
+        if backend == "int8":
+            import torch
+            self.model = torch.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif backend == "onnx":
+            self.session = _onnx_session(self.model, model_name)
+        elif backend != "torch":
+            raise ValueError(f"Unknown embedding backend: {backend}")
+
+        self._queries = QueryBatcher(self._encode)
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        if self.backend != "onnx":
+            return self.model.encode(
+                texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True
+            )
+
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feeds = {
+            inp.name: encoded[inp.name].astype("int64")
+            for inp in self.session.get_inputs() if inp.name in encoded
+        }
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalise (the MiniLM head)
+        mask = encoded["attention_mask"][..., None].astype("float32")
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        lengths = [
+            min(len(ids), self.max_length)
+            for ids in self.tokenizer(texts, add_special_tokens=True, truncation=True)["input_ids"]
+        ]
+        vectors = [None] * len(texts)
+        for batch in length_sorted_batches(lengths):
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch])):
+                vectors[i] = list(map(float, vector))
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._queries.embed(text)
+
+
+def _onnx_session(model, model_name: str):
+    try:
+        import onnxruntime
+    except ImportError:
+        raise RuntimeError("EMBEDDING_BACKEND=onnx needs `pip install onnxruntime`")
+
+    path = os.path.join(ONNX_MODELS_PATH, model_name.replace("/", "__") + ".onnx")
+    if not os.path.exists(path):
+        _export_onnx(model, path)
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _export_onnx(model, path: str):
+    import torch
+
+    print(f"📦 Exporting embedding model to ONNX: {path}")
+    transformer = model[0].auto_model.eval()
+    sample = model.tokenizer(["export"], padding="max_length", max_length=8, return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in names),
+            tmp_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=14,
+        )
+    os.replace(tmp_path, path)
+
+
+def parity_report(candidate, reference, texts: list[str], tolerance: float) -> dict:
+    """Cosine agreement of candidate vectors with the reference model's."""
+    got = np.asarray(candidate.embed_documents(texts), dtype="float32")
+    want = np.asarray(reference.embed_documents(texts), dtype="float32")
+
+    cosine = (got * want).sum(axis=1) / (
+        np.linalg.norm(got, axis=1) * np.linalg.norm(want, axis=1)
+    )
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosine.min()), 6),
+        "mean_cosine": round(float(cosine.mean()), 6),
+        "max_abs_diff": round(float(np.abs(got - want).max()), 6),
+        "tolerance": tolerance,
+        "ok": bool(cosine.min() >= tolerance),
+    }
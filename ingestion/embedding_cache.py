@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.file_utils import file_lock
+
+# EMBEDDING_CACHE=0 embeds every chunk from scratch
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "1") != "0"
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join("vector_db", ".embedding_cache")
+)
+
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.bin"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+KEY_BYTES = 32
+
+
+def model_name_of(embeddings) -> str:
+    name = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None)
+    if not name:
+        name = f"{type(embeddings).__name__}-{getattr(embeddings, 'size', '')}"
+    return str(name)
+
+
+class EmbeddingCache:
+    """
+    Append-only, content-addressed vector store for one embedding model.
+
+    vectors.f32 holds raw float32 rows and is read through a memory map;
+    keys.bin holds the sha256(model, text) digest of each row in the same
+    order. Rows are written before their keys, so a crash mid-append only
+    leaves unreferenced vector bytes behind. Appends take a file lock and
+    first pick up rows written by other processes (app and API share it).
+    """
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        self.dim = None
+        self._rows = {}
+        self._vectors = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_path = self._file(META_FILE)
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            return
+        self.dim = meta["dim"]
+        self._refresh()
+
+    def _refresh(self):
+        """Index rows appended since we last looked, possibly by another process."""
+        if self.dim is None:
+            return self._load()
+
+        known = len(self._rows)
+        if not os.path.exists(self._file(KEYS_FILE)) or not os.path.exists(self._file(VECTORS_FILE)):
+            return
+        with open(self._file(KEYS_FILE), "rb") as f:
+            f.seek(known * KEY_BYTES)
+            keys = f.read()
+        vector_rows = os.path.getsize(self._file(VECTORS_FILE)) // (self.dim * 4)
+        rows = min(known + len(keys) // KEY_BYTES, vector_rows)
+
+        for i in range(rows - known):
+            self._rows[keys[i * KEY_BYTES:(i + 1) * KEY_BYTES]] = known + i
+        if rows != known or self._vectors is None:
+            self._map(rows)
+
+    def _map(self, rows: int):
+        self._vectors = None
+        if rows:
+            self._vectors = np.memmap(
+                self._file(VECTORS_FILE), dtype="float32", mode="r", shape=(rows, self.dim)
+            )
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys: list[bytes]) -> list:
+        """Cached vector (or None) for each key."""
+        with self._lock:
+            rows = [self._rows.get(key) for key in keys]
+            return [None if row is None else np.array(self._vectors[row]) for row in rows]
+
+    def put_many(self, keys: list[bytes], vectors):
+        with self._lock, file_lock(self._file(LOCK_FILE)):
+            self._refresh()
+            fresh = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    fresh[key] = vector
+            if not fresh:
+                return
+
+            block = np.asarray(list(fresh.values()), dtype="float32")
+            if self.dim is None:
+                self.dim = block.shape[1]
+                # Start clean: anything left here belonged to another model
+                for name in (VECTORS_FILE, KEYS_FILE):
+                    if os.path.exists(self._file(name)):
+                        os.remove(self._file(name))
+                with open(self._file(META_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+
+            first_row = len(self._rows)
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                # Drop any orphaned bytes from an interrupted append
+                f.truncate(first_row * self.dim * 4)
+                f.write(block.tobytes())
+            with open(self._file(KEYS_FILE), "ab") as f:
+                f.truncate(first_row * KEY_BYTES)
+                f.write(b"".join(fresh))
+
+            for i, key in enumerate(fresh):
+                self._rows[key] = first_row + i
+            self._map(len(self._rows))
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only runs the model on text it has not seen."""
+
+    def __init__(self, embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self.cache.key(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            self.cache.put_many([keys[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [list(map(float, vector)) for vector in vectors]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def cached_embeddings(embeddings):
+    """Wrap `embeddings` with the on-disk cache for its model (when enabled)."""
+    if not EMBEDDING_CACHE_ENABLED:
+        return embeddings
+
+    model_name = model_name_of(embeddings)
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+            cache = EmbeddingCache(os.path.join(EMBEDDING_CACHE_PATH, slug), model_name)
+            _caches[model_name] = cache
+    return CachedEmbeddings(embeddings, cache)
@@ -0,0 +1,76 @@
+"""
+Check that an embedding backend stays within tolerance of the reference model.
+
+    python -m ingestion.embedding_parity urban_threadz --backend onnx --texts 200
+
+Embeds chunks from the business's indexed documents (or built-in samples
+when nothing is indexed yet) with both models and compares the vectors.
+Exits non-zero when the minimum cosine similarity is below tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from ingestion.embedder import EMBEDDING_MODEL_NAME, get_reference_embeddings
+from ingestion.embedding_backends import SentenceTransformerEmbeddings, parity_report
+from ingestion.ingest import VECTOR_DB_PATH
+from ingestion.store_format import load_store
+
+# Minimum cosine similarity to the reference vectors per backend
+TOLERANCES = {"torch": 0.9999, "onnx": 0.999, "int8": 0.98}
+
+SAMPLE_TEXTS = [
+    "What is your return policy?",
+    "Standard shipping takes 3-5 business days within the continental US.",
+    "The olive cargo pants (UT-1042) are made from organic cotton.",
+    "Do you ship internationally?",
+]
+
+
+def _indexed_texts(business_id: str, limit: int) -> list[str]:
+    texts = []
+    business_path = os.path.join(VECTOR_DB_PATH, business_id)
+    for access in ("public", "admin"):
+        path = os.path.join(business_path, access)
+        if not os.path.exists(path):
+            continue
+        store = load_store(path, get_reference_embeddings())
+        for doc_id in list(store.index_to_docstore_id.values())[:limit - len(texts)]:
+            texts.append(store.docstore.search(doc_id).page_content)
+    return texts
+
+
+def _timed_embed(embeddings, texts: list[str]) -> float:
+    started = time.perf_counter()
+    embeddings.embed_documents(texts)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("business_id", nargs="?")
+    parser.add_argument("--backend", default="onnx", help="torch | int8 | onnx")
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--tolerance", type=float)
+    args = parser.parse_args()
+
+    texts = _indexed_texts(args.business_id, args.texts) if args.business_id else []
+    texts = texts or SAMPLE_TEXTS
+
+    candidate = SentenceTransformerEmbeddings(EMBEDDING_MODEL_NAME, backend=args.backend)
+    reference = get_reference_embeddings()
+    tolerance = args.tolerance if args.tolerance is not None else TOLERANCES[args.backend]
+
+    report = parity_report(candidate, reference, texts, tolerance)
+    report["backend"] = args.backend
+    report["backend_s"] = round(_timed_embed(candidate, texts), 3)
+    report["reference_s"] = round(_timed_embed(reference, texts), 3)
+    print(json.dumps(report, indent=2))
+
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
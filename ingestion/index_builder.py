@@ -0,0 +1,177 @@
+import json
+import math
+import os
+import faiss
+import numpy as np
+from app.tenants import business_exists, load_business_config
+
+INDEX_META_FILE = "index_meta.json"
+
+# Defaults for the optional "vector_index" block in business.json, e.g.
+# "vector_index": {"type": "hnsw", "hnsw_m": 32, "ef_search": 64}
+DEFAULT_INDEX_SPEC = {
+    "type": "flat",            # flat | hnsw | ivf | ivfpq | sq8
+    "hnsw_m": 32,
+    "ef_construction": 80,
+    "ef_search": 64,
+    "nlist": None,             # IVF centroids; derived from corpus size when None
+    "nprobe": 8,
+    "pq_m": 16,                # PQ sub-quantizers (must divide the 384 dims)
+    "min_train_size": 2000,    # below this, trained types fall back to flat
+    "retrain_growth": 2.0,     # retrain once the corpus grows by this factor
+}
+
+# Index types whose stored vectors can be read back exactly
+_EXACT_TYPES = {"flat", "hnsw"}
+_TRAINED_TYPES = {"ivf", "ivfpq", "sq8"}
+
+# Flat-coded indexes compact their ids on removal, which is what
+# LangChain's FAISS.delete expects; the others are rebuilt instead
+_REMOVABLE_TYPES = {"flat", "sq8"}
+
+
+def load_index_spec(business_id: str) -> dict:
+    spec = dict(DEFAULT_INDEX_SPEC)
+    if business_exists(business_id):
+        spec.update(load_business_config(business_id).get("vector_index", {}))
+    return spec
+
+
+def index_type_of(index) -> str:
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    return "flat"
+
+
+def effective_type(spec: dict, n_vectors: int) -> str:
+    """Trained index types need enough vectors to learn from."""
+    if spec["type"] in _TRAINED_TYPES and n_vectors < spec["min_train_size"]:
+        return "flat"
+    return spec["type"]
+
+
+def _factory_string(index_type: str, spec: dict, n_vectors: int) -> str:
+    nlist = spec["nlist"] or max(1, int(4 * math.sqrt(n_vectors)))
+    return {
+        "flat": "Flat",
+        "hnsw": f"HNSW{spec['hnsw_m']}",
+        "ivf": f"IVF{nlist},Flat",
+        "ivfpq": f"IVF{nlist},PQ{spec['pq_m']}",
+        "sq8": "SQ8",
+    }[index_type]
+
+
+def build_index(vectors: np.ndarray, spec: dict):
+    """Build, train and fill a FAISS index of the configured type."""
+    n_vectors, dim = vectors.shape
+    index_type = effective_type(spec, n_vectors)
+
+    index = faiss.index_factory(dim, _factory_string(index_type, spec, n_vectors))
+
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = spec["ef_construction"]
+        index.hnsw.efSearch = spec["ef_search"]
+
+    if not index.is_trained:
+        index.train(vectors)
+
+    if index_type in ("ivf", "ivfpq"):
+        index.nprobe = spec["nprobe"]
+
+    index.add(vectors)
+    return index, index_type
+
+
+def read_index_meta(store_path: str) -> dict:
+    """{"trained_on": <corpus size the current index was built for>}"""
+    path = os.path.join(store_path, INDEX_META_FILE)
+    if not os.path.exists(path):
+        return {"trained_on": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_index_meta(store_path: str, meta: dict):
+    os.makedirs(store_path, exist_ok=True)
+    with open(os.path.join(store_path, INDEX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def stored_vectors(vectorstore, embeddings) -> np.ndarray:
+    """
+    Vectors for every position of the index, in index order.
+
+    Exact indexes are read back directly; compressed ones (IVF/PQ/SQ) are
+    re-embedded from the docstore text so retraining never compounds loss.
+    """
+    index = vectorstore.index
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+
+    if index_type_of(index) in _EXACT_TYPES:
+        return index.reconstruct_n(0, index.ntotal)
+
+    texts = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(index.ntotal)
+    ]
+    return np.asarray(embeddings.embed_documents(texts), dtype="float32")
+
+
+def _rebuild(vectorstore, vectors: np.ndarray, spec: dict, meta: dict):
+    index, index_type = build_index(vectors, spec)
+    vectorstore.index = index
+    meta["trained_on"] = index.ntotal
+    print(f"🧱 Rebuilt {index_type} index over {index.ntotal} vectors")
+
+
+def remove_ids(vectorstore, ids, spec: dict, meta: dict, embeddings):
+    """Delete chunks, rebuilding the index when its type cannot compact ids."""
+    if not ids:
+        return
+
+    if index_type_of(vectorstore.index) in _REMOVABLE_TYPES:
+        vectorstore.delete(ids)
+        return
+
+    doomed = set(ids)
+    vectors = stored_vectors(vectorstore, embeddings)
+    keep = [
+        i for i in range(vectorstore.index.ntotal)
+        if vectorstore.index_to_docstore_id[i] not in doomed
+    ]
+    kept_ids = [vectorstore.index_to_docstore_id[i] for i in keep]
+
+    vectorstore.docstore.delete(list(doomed))
+    vectorstore.index_to_docstore_id = dict(enumerate(kept_ids))
+    _rebuild(vectorstore, vectors[keep], spec, meta)
+
+
+def ensure_index_type(vectorstore, spec: dict, meta: dict, embeddings):
+    """
+    Convert the store to the configured index type, and retrain trained
+    types once the corpus has grown by `retrain_growth` since training.
+    """
+    n_vectors = vectorstore.index.ntotal
+    if n_vectors == 0:
+        return
+
+    wanted = effective_type(spec, n_vectors)
+    current = index_type_of(vectorstore.index)
+
+    grown = (
+        wanted in _TRAINED_TYPES
+        and n_vectors > meta.get("trained_on", 0) * spec["retrain_growth"]
+    )
+
+    if wanted == current and not grown:
+        return
+
+    _rebuild(vectorstore, stored_vectors(vectorstore, embeddings), spec, meta)
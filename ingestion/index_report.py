@@ -0,0 +1,83 @@
+"""
+Recall-vs-latency report for a business's configured ANN index.
+
+    python -m ingestion.index_report urban_threadz --queries 200 --k 4
+
+Rebuilds each partition with the business.json "vector_index" settings and
+compares it against exact (flat) search, using stored chunk vectors
+perturbed with a little noise as queries.
+"""
+import argparse
+import json
+import os
+import time
+import faiss
+import numpy as np
+from ingestion.embedder import get_embeddings
+from ingestion.index_builder import build_index, load_index_spec, stored_vectors
+from ingestion.ingest import VECTOR_DB_PATH
+from ingestion.store_format import load_store
+
+
+def _timed_search(index, queries: np.ndarray, k: int):
+    started = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - started) / len(queries)
+
+
+def report_partition(store_path: str, spec: dict, n_queries: int, k: int, seed: int = 0) -> dict:
+    vectorstore = load_store(store_path, get_embeddings())
+    vectors = stored_vectors(vectorstore, get_embeddings())
+    if len(vectors) == 0:
+        return {"vectors": 0}
+
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+    queries = (sample + rng.normal(0, 0.01, sample.shape)).astype("float32")
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    truth, exact_latency = _timed_search(exact, queries, k)
+
+    started = time.perf_counter()
+    candidate, index_type = build_index(vectors, spec)
+    build_seconds = time.perf_counter() - started
+    found, ann_latency = _timed_search(candidate, queries, k)
+
+    recall = np.mean([
+        len(set(t) & set(f)) / k for t, f in zip(truth, found)
+    ])
+
+    return {
+        "vectors": len(vectors),
+        "index_type": index_type,
+        f"recall@{k}": round(float(recall), 4),
+        "exact_latency_ms": round(exact_latency * 1000, 4),
+        "ann_latency_ms": round(ann_latency * 1000, 4),
+        "build_seconds": round(build_seconds, 3),
+        "index_bytes": int(faiss.serialize_index(candidate).nbytes),
+        "exact_bytes": int(faiss.serialize_index(exact).nbytes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("business_id")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    spec = load_index_spec(args.business_id)
+    business_path = os.path.join(VECTOR_DB_PATH, args.business_id)
+
+    results = {"spec": spec, "partitions": {}}
+    for access in ("public", "admin"):
+        store_path = os.path.join(business_path, access)
+        if os.path.isdir(store_path):
+            results["partitions"][access] = report_partition(store_path, spec, args.queries, args.k)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,248 @@
+import multiprocessing
 import os
-import tempfile
-from langchain_community.vectorstores import FAISS
-from ingestion.loader import load_document
-from ingestion.chunker import chunk_documents
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from ingestion.pipeline import (
+    BatchIndexWriter, IngestStats, parse_and_chunk, PARSE_WORKERS, MAX_INFLIGHT_FILES
+)
 from ingestion.embedder import get_embeddings
+from ingestion.embedding_cache import CachedEmbeddings, cached_embeddings
+from ingestion.versioning import bump_index_version
+from ingestion.keyword_index import KeywordIndex
+from ingestion.store_format import CorruptStoreError, load_store, save_store
+from ingestion.index_builder import (
+    load_index_spec, read_index_meta, write_index_meta, remove_ids, ensure_index_type
+)
+from ingestion.manifest import load_manifest, save_manifest, manifest_key, content_hash, file_hash
 from app.config import BUSINESS_ID
+from utils.file_utils import file_lock
+from utils.tracing import observe, span, trace
 
 VECTOR_DB_PATH = "vector_db"
 
-def ingest_files(uploaded_files, business_id: str, access: str, max_docs: int | None = None
-):
-    if not uploaded_files:
+# Held for the whole run so separate processes (app, API, CLI) never write
+# the same business at once
+WRITER_LOCK_FILE = ".ingest.lock"
+
+def _open_vectorstore(partition_path: str, embeddings, entries: dict, access: str):
+    """Load the existing partition store, or return None to build a fresh one."""
+    if not os.path.exists(partition_path):
+        return None
+
+    try:
+        return load_store(partition_path, embeddings)
+    except CorruptStoreError as e:
+        # Never paper over a damaged index with a silent full rebuild
+        raise CorruptStoreError(
+            f"{e}. Restore {partition_path} or delete it to rebuild from the source documents."
+        ) from e
+    except Exception as e:
+        print(f"Rebuilding FAISS index {partition_path}: {e}")
+        # The old vectors are gone, so every other file in this partition
+        # must be re-ingested
+        for key in [k for k, entry in entries.items() if entry["access"] == access]:
+            del entries[key]
+        return None
+
+
+def ingest_files(uploaded_files, business_id: str, access: str, max_docs: int | None = None,
+                 prune_missing: bool = False):
+    """
+    Incrementally sync files into the `access` partition of the business
+    vector store (vector_db/<business_id>/<access>).
+
+    Unchanged files (same content hash in the manifest) are skipped, changed
+    files have their old chunks replaced, and with `prune_missing=True` any
+    manifest entry for this access level that is not in `uploaded_files` is
+    purged from the index.
+
+    Changed files are parsed in a process pool while the main thread embeds
+    finished chunks in batches and appends them to FAISS; at most
+    MAX_INFLIGHT_FILES files are held in memory at once. Returns per-stage
+    throughput stats, or None when nothing was ingested.
+    """
+    lock_path = os.path.join(VECTOR_DB_PATH, business_id, WRITER_LOCK_FILE)
+    with trace("ingest", business_id=business_id, access=access,
+               files=len(uploaded_files or [])), file_lock(lock_path):
+        return _ingest_files(uploaded_files, business_id, access, max_docs, prune_missing)
+
+
+def _ingest_files(uploaded_files, business_id: str, access: str, max_docs: int | None,
+                  prune_missing: bool):
+    if not uploaded_files and not prune_missing:
         return
 
+    uploaded_files = uploaded_files or []
+
     if max_docs is not None and len(uploaded_files) > max_docs:
         raise ValueError(f"Maximum {max_docs} documents allowed for this package.")
 
-    all_docs = []
+    business_path = os.path.join(VECTOR_DB_PATH, business_id)
+    partition_path = os.path.join(business_path, access)
+    manifest = load_manifest(business_path)
+    entries = manifest["files"]
+
+    # Rebuilds and re-uploads only embed chunk text the cache hasn't seen
+    embeddings = cached_embeddings(get_embeddings())
+    stats = IngestStats()
+    writer = BatchIndexWriter(
+        lambda: _open_vectorstore(partition_path, embeddings, entries, access),
+        embeddings,
+        stats
+    )
+
+    new_entries = {}
+    stale_ids = []
+    seen_keys = set()
+    skipped = 0
 
-    for file in uploaded_files:
-        filename = os.path.basename(file.name).lower()
+    def collect(key, sha, filename, result):
+        chunks, parse_seconds = result
+        chunk_ids = [str(uuid.uuid4()) for _ in chunks]
 
-        # ✅ HARD FILTER (no more unsupported file crashes)
-        if not filename.endswith((".pdf", ".txt", ".docx")):
-            print(f"Skipping unsupported file: {filename}")
-            continue
+        stats.files += 1
+        stats.chunks += len(chunks)
+        stats.parse_seconds += parse_seconds
+        # Parsing ran in a worker process, so record its time directly
+        observe("ingest_parse_file", parse_seconds)
+
+        writer.add(chunks, chunk_ids)
+        new_entries[key] = {
+            "sha256": sha,
+            "access": access,
+            "source": filename,
+            "chunk_ids": chunk_ids,
+        }
+
+    workers = min(PARSE_WORKERS, len(uploaded_files))
+    # Spawned, not forked: callers (app, API, ingest queue) already run
+    # threads whose held locks a forked child would inherit
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) if workers > 1 else None
+    inflight = {}
+
+    try:
+        for file in uploaded_files:
+            filename = os.path.basename(file.name).lower()
 
-        # ✅ Normalize to temp file (works for upload + disk)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=filename) as tmp:
-            tmp.write(file.read())
-            temp_path = tmp.name
+            # ✅ HARD FILTER (no more unsupported file crashes)
+            if not filename.endswith((".pdf", ".txt", ".docx")):
+                print(f"Skipping unsupported file: {filename}")
+                continue
 
-        try:
-            documents = load_document(temp_path)
+            key = manifest_key(access, filename)
+            seen_keys.add(key)
 
-            for doc in documents:
-                doc.metadata.update({
-                    "business_id": business_id,
-                    "access": access,
-                    "source": filename
-                })
+            # On-disk sources are hashed and parsed in place; uploads stay in memory
+            started = time.perf_counter()
+            path = getattr(file, "path", None)
+            if path:
+                source = os.fspath(path)
+                sha = file_hash(source)
+                stats.bytes_read += os.path.getsize(source)
+            else:
+                source = file.read()
+                sha = content_hash(source)
+                stats.bytes_read += len(source)
+            stats.read_seconds += time.perf_counter() - started
 
-            chunks = chunk_documents(documents)
-            all_docs.extend(chunks)
+            previous = entries.get(key)
+            if previous and previous["sha256"] == sha:
+                skipped += 1
+                continue
 
-        finally:
-            os.remove(temp_path)
+            if previous:
+                stale_ids.extend(previous["chunk_ids"])
 
-    if not all_docs:
+            metadata = {
+                "business_id": business_id,
+                "access": access,
+                "source": filename
+            }
+
+            if pool is None:
+                collect(key, sha, filename, parse_and_chunk(filename, source, metadata))
+                continue
+
+            future = pool.submit(parse_and_chunk, filename, source, metadata)
+            inflight[future] = (key, sha, filename)
+            del source
+
+            # Bound memory: drain finished parses before reading more files
+            while len(inflight) >= MAX_INFLIGHT_FILES:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(*inflight.pop(future), future.result())
+
+        for future in as_completed(list(inflight)):
+            collect(*inflight.pop(future), future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    pruned_keys = []
+    if prune_missing:
+        for key, entry in entries.items():
+            if entry["access"] == access and key not in seen_keys:
+                print(f"Purging deleted file: {entry['source']}")
+                stale_ids.extend(entry["chunk_ids"])
+                pruned_keys.append(key)
+
+    if not seen_keys and not prune_missing:
         raise ValueError("No valid documents found for ingestion.")
+
+    if not new_entries and not stale_ids and not pruned_keys:
+        print(f"✅ Index for {business_id}/{access} is up to date ({skipped} unchanged)")
         return
 
-    embeddings = get_embeddings()
-    business_path = os.path.join(VECTOR_DB_PATH, business_id)
+    vectorstore = writer.finish()
 
-    try:
-        if os.path.exists(business_path):
-            vectorstore = FAISS.load_local(
-                business_path,
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-            vectorstore.add_documents(all_docs)
-        else:
-            raise FileNotFoundError
-    except Exception as e:
-        print(f"Rebuilding FAISS index for {business_id}: {e}")
-        vectorstore = FAISS.from_documents(all_docs, embeddings)
+    if vectorstore is None:
+        # Nothing to index; persist the (possibly reset) manifest so the next
+        # sync re-ingests whatever a lost index used to hold
+        save_manifest(business_path, manifest)
+        return
+
+    indexed_ids = set(vectorstore.index_to_docstore_id.values())
+    stale_ids = [i for i in stale_ids if i in indexed_ids]
+
+    # Per-business ANN index type (business.json "vector_index")
+    spec = load_index_spec(business_id)
+    index_meta = read_index_meta(partition_path)
+    with span("ingest_index_maintenance", removed=len(stale_ids), index_type=spec["type"]):
+        remove_ids(vectorstore, stale_ids, spec, index_meta, embeddings)
+        ensure_index_type(vectorstore, spec, index_meta, embeddings)
+
+    for key in pruned_keys:
+        entries.pop(key, None)
+    entries.update(new_entries)
+
+    # Keep the BM25 index in step with the vectors (adds, removals, backfill)
+    with span("ingest_keyword_sync"):
+        keywords = KeywordIndex.load(partition_path) or KeywordIndex()
+        keywords.sync(vectorstore)
+
+    with span("ingest_save", vectors=vectorstore.index.ntotal):
+        save_store(vectorstore, partition_path)
+        keywords.save(partition_path)
+        write_index_meta(partition_path, index_meta)
+        save_manifest(business_path, manifest)
+
+    # Readers reload the resident partition only when this stamp changes
+    bump_index_version(partition_path)
 
-    vectorstore.save_local(business_path)
+    report = stats.as_dict()
+    if isinstance(embeddings, CachedEmbeddings):
+        report["embedding_cache_hits"] = embeddings.hits
+        report["embedding_cache_misses"] = embeddings.misses
+    print(
+        f"✅ Ingested {len(new_entries)} file(s) into {business_id}/{access}: "
+        f"{report['chunks']} chunks added, {len(stale_ids)} removed, {skipped} unchanged"
+    )
+    print(f"📊 Ingestion throughput: {report}")
+    return report
 
 if __name__ == "__main__":
     from pathlib import Path
@@ -82,10 +256,10 @@ if __name__ == "__main__":
     class FileLike:
         def __init__(self, path):
             self.name = path.name
-            self._path = path
+            self.path = path
 
         def read(self):
-            return self._path.read_bytes()
+            return self.path.read_bytes()
 
     admin_files = [FileLike(p) for p in admin_docs]
     public_files = [FileLike(p) for p in public_docs]
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from types import SimpleNamespace
+from ingestion.ingest import ingest_files
+
+# Finished jobs kept per business for the admin UI / API
+JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "50"))
+
+
+class IngestJob:
+    def __init__(self, business_id: str, access: str, files: list, prune_missing: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.business_id = business_id
+        self.access = access
+        self.files = files
+        self.prune_missing = prune_missing
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.merged_into = None
+        self.report = None
+        self.error = None
+        self._done = threading.Event()
+
+    def _finish(self, status: str, report=None, error=None):
+        self.status = status
+        self.report = report
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "business_id": self.business_id,
+            "access": self.access,
+            "files": [f.name for f in self.files],
+            "prune_missing": self.prune_missing,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "merged_into": self.merged_into,
+            "report": self.report,
+            "error": self.error,
+        }
+
+
+def _snapshot(file):
+    """Detach an upload from its request/session: keep a path or the bytes."""
+    path = getattr(file, "path", None)
+    if path:
+        return SimpleNamespace(name=file.name, path=os.fspath(path))
+    data = file.read()
+    return SimpleNamespace(name=file.name, read=lambda: data)
+
+
+class IngestQueue:
+    """
+    Single writer per business.
+
+    Every ingestion for a business goes through one worker thread (started
+    on demand, exits when idle), so Streamlit sessions and API requests
+    never write a partition at the same time. Consecutive queued jobs of
+    the same kind are merged into one ingest run: uploads are combined,
+    and for full syncs (`prune_missing`) the newest file listing wins.
+    Readers keep serving the previous index version until the new one is
+    saved and stamped.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._history = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def submit(self, business_id: str, access: str, files, max_docs: int | None = None,
+               prune_missing: bool = False) -> IngestJob:
+        files = list(files or [])
+        if max_docs is not None and len(files) > max_docs:
+            raise ValueError(f"Maximum {max_docs} documents allowed for this package.")
+
+        job = IngestJob(business_id, access, [_snapshot(f) for f in files], prune_missing)
+        with self._lock:
+            self._pending.setdefault(business_id, deque()).append(job)
+            self._history.setdefault(business_id, deque(maxlen=JOB_HISTORY)).append(job)
+            if business_id not in self._workers:
+                worker = threading.Thread(
+                    target=self._work, args=(business_id,), name=f"ingest-{business_id}", daemon=True
+                )
+                self._workers[business_id] = worker
+                worker.start()
+        return job
+
+    def _next_batch(self, business_id: str) -> list[IngestJob]:
+        # Caller holds self._lock
+        pending = self._pending.get(business_id)
+        if not pending:
+            return []
+
+        batch = [pending.popleft()]
+        kind = (batch[0].access, batch[0].prune_missing)
+        while pending and (pending[0].access, pending[0].prune_missing) == kind:
+            batch.append(pending.popleft())
+        return batch
+
+    def _work(self, business_id: str):
+        while True:
+            with self._lock:
+                batch = self._next_batch(business_id)
+                if not batch:
+                    del self._workers[business_id]
+                    return
+            self._run(business_id, batch)
+
+    def _run(self, business_id: str, batch: list[IngestJob]):
+        lead = batch[-1]
+        if lead.prune_missing:
+            files = lead.files
+        else:
+            # Later uploads of the same filename replace earlier ones
+            by_name = {}
+            for job in batch:
+                for f in job.files:
+                    by_name[os.path.basename(f.name).lower()] = f
+            files = list(by_name.values())
+
+        started = time.time()
+        for job in batch:
+            job.status = "running"
+            job.started_at = started
+            if job is not lead:
+                job.merged_into = lead.id
+
+        try:
+            report = ingest_files(files, business_id, lead.access, prune_missing=lead.prune_missing)
+        except Exception as e:
+            traceback.print_exc()
+            for job in batch:
+                job._finish("failed", error=str(e))
+            return
+
+        for job in batch:
+            job._finish("done", report=report)
+
+    def jobs(self, business_id: str) -> list[dict]:
+        """Recent jobs for a business, newest first."""
+        with self._lock:
+            history = list(self._history.get(business_id, ()))
+        return [job.as_dict() for job in reversed(history)]
+
+    def busy(self, business_id: str) -> bool:
+        with self._lock:
+            return business_id in self._workers
+
+
+_queue = IngestQueue()
+
+
+def get_ingest_queue() -> IngestQueue:
+    return _queue
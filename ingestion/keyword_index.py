@@ -0,0 +1,113 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+KEYWORD_INDEX_FILE = "keywords.json"
+
+# Keep SKUs and codes like "UT-1042" or "size_xl" as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-_]*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordIndex:
+    """
+    In-process BM25 inverted index over the chunks of one partition,
+    keyed by the same docstore ids as the FAISS index.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.postings = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self.doc_terms:
+            self.remove(doc_id)
+
+        self._index(doc_id, Counter(tokenize(text)))
+
+    def _index(self, doc_id: str, terms: Counter):
+        length = sum(terms.values())
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+
+    def sync(self, vectorstore):
+        """Make the index cover exactly the chunks in `vectorstore`."""
+        indexed_ids = set(vectorstore.index_to_docstore_id.values())
+
+        for doc_id in [d for d in self.doc_terms if d not in indexed_ids]:
+            self.remove(doc_id)
+
+        for doc_id in indexed_ids:
+            if doc_id not in self.doc_terms:
+                self.add(doc_id, vectorstore.docstore.search(doc_id).page_content)
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        n_docs = len(self.doc_terms)
+        if not n_docs:
+            return []
+
+        avg_length = self.total_length / n_docs
+        scores = Counter()
+
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return scores.most_common(k)
+
+    def save(self, store_path: str):
+        path = os.path.join(store_path, KEYWORD_INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": self.doc_terms}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, store_path: str):
+        """Return the saved index, or None if the partition has none yet."""
+        path = os.path.join(store_path, KEYWORD_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        index = cls(k1=data["k1"], b=data["b"])
+        for doc_id, terms in data["docs"].items():
+            index._index(doc_id, Counter(terms))
+        return index
@@ -1,23 +1,76 @@
-from langchain_community.document_loaders import PyMuPDFLoader, TextLoader, Docx2txtLoader
-import tempfile
+import io
 import os
+import docx2txt
+import fitz  # PyMuPDF
+from langchain_core.documents import Document
 
-def load_document(file_path: str):
+
+def _load_pdf(source, name: str):
+    # PyMuPDF reads paths in place and bytes/memoryview without a copy to disk
+    if isinstance(source, str):
+        pdf = fitz.open(source)
+    else:
+        pdf = fitz.open(stream=source, filetype="pdf")
+
+    with pdf:
+        total_pages = pdf.page_count
+        return [
+            Document(
+                page_content=page.get_text(),
+                metadata={
+                    "source": name,
+                    "file_path": name,
+                    "page": page.number,
+                    "total_pages": total_pages,
+                }
+            )
+            for page in pdf
+        ]
+
+
+def _load_txt(source, name: str):
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = bytes(source).decode("utf-8")
+
+    return [Document(page_content=text, metadata={"source": name})]
+
+
+def _load_docx(source, name: str):
+    # docx2txt opens the archive with zipfile, which accepts file-like objects
+    if not isinstance(source, str):
+        source = io.BytesIO(source)
+
+    return [Document(page_content=docx2txt.process(source), metadata={"source": name})]
+
+
+LOADERS = {
+    ".pdf": _load_pdf,
+    ".txt": _load_txt,
+    ".docx": _load_docx,
+}
+
+
+def load_document(source, filename: str | None = None):
     """
     Supports:
-    - Streamlit UploadedFile
-    - Normal opened files from disk (rb)
+    - A path on disk (read in place, no copy)
+    - In-memory bytes / bytearray / memoryview, e.g. a Streamlit UploadedFile's
+      contents; `filename` is then required to pick the loader
     """
-    
-    ext = os.path.splitext(file_path)[1].lower()
-
-    if ext == ".pdf":
-        loader = PyMuPDFLoader(file_path)
-    elif ext == ".txt":
-        loader = TextLoader(file_path, encoding="utf-8")
-    elif ext == ".docx":
-        loader = Docx2txtLoader(file_path)
-    else:
+    if isinstance(source, os.PathLike):
+        source = os.fspath(source)
+
+    name = filename or (source if isinstance(source, str) else None)
+    if name is None:
+        raise ValueError("filename is required when loading from a buffer")
+
+    ext = os.path.splitext(name)[1].lower()
+
+    loader = LOADERS.get(ext)
+    if loader is None:
         raise ValueError(f"Unsupported file type: {ext}")
 
-    return loader.load()
\ No newline at end of file
+    return loader(source, name)
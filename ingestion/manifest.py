@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILE = "manifest.json"
+
+# Bumped whenever the on-disk index layout changes; older manifests are
+# discarded so their files get re-ingested into the new layout
+MANIFEST_VERSION = 2
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file on disk in fixed-size blocks without loading it whole."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_key(access: str, filename: str) -> str:
+    return f"{access}/{filename}"
+
+
+def load_manifest(store_path: str) -> dict:
+    """
+    Manifest layout:
+    {"version": 2, "files": {"<access>/<filename>": {"sha256", "access", "source", "chunk_ids"}}}
+
+    Chunk ids refer to the docstore of the vector_db/<business_id>/<access>
+    partition.
+    """
+    path = os.path.join(store_path, MANIFEST_FILE)
+    empty = {"version": MANIFEST_VERSION, "files": {}}
+    if not os.path.exists(path):
+        return empty
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable manifest {path}: {e}")
+        return empty
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"Manifest {path} is from an older index layout, re-ingesting")
+        return empty
+
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_manifest(store_path: str, manifest: dict):
+    os.makedirs(store_path, exist_ok=True)
+    path = os.path.join(store_path, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
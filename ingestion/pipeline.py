@@ -0,0 +1,132 @@
+import os
+import time
+from langchain_community.vectorstores import FAISS
+from ingestion.loader import load_document
+from ingestion.chunker import chunk_documents
+from utils.tracing import span
+
+# Parse workers (PyMuPDF / docx2txt / text decoding are CPU bound)
+PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", os.cpu_count() or 1))
+
+# Chunks are embedded and appended to FAISS in batches of this size
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+
+# Memory ceiling: files read but not yet embedded at any one time
+MAX_INFLIGHT_FILES = int(os.getenv("INGEST_MAX_INFLIGHT_FILES", "4"))
+
+
+def parse_and_chunk(filename: str, source, metadata: dict):
+    """
+    Load one file and split it into chunks. Runs inside a worker process.
+
+    `source` is either a path on disk (parsed in place) or the file's bytes.
+    """
+    started = time.perf_counter()
+
+    documents = load_document(source, filename)
+
+    for doc in documents:
+        doc.metadata.update(metadata)
+
+    chunks = chunk_documents(documents)
+    return chunks, time.perf_counter() - started
+
+
+class IngestStats:
+    """Per-stage counters and timings for one ingestion run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self.chunks = 0
+        self.parse_seconds = 0.0
+        self.batches = 0
+        self.embed_seconds = 0.0
+        self.index_seconds = 0.0
+
+    @staticmethod
+    def _rate(count, seconds):
+        return round(count / seconds, 2) if seconds > 0 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "read_mb_per_s": self._rate(self.bytes_read / 1e6, self.read_seconds),
+            "parse_files_per_s": self._rate(self.files, self.parse_seconds),
+            "embed_chunks_per_s": self._rate(self.chunks, self.embed_seconds),
+            "index_chunks_per_s": self._rate(self.chunks, self.index_seconds),
+        }
+
+
+class BatchIndexWriter:
+    """
+    Embeds chunks in fixed-size batches and appends each batch to the
+    FAISS store as soon as it is full, so only one batch of chunk text is
+    buffered at a time.
+    """
+
+    def __init__(self, open_store, embeddings, stats: IngestStats,
+                 batch_size: int = EMBED_BATCH_SIZE):
+        self._open_store = open_store
+        self.embeddings = embeddings
+        self.stats = stats
+        self.batch_size = batch_size
+        self.vectorstore = None
+        self._opened = False
+        self._docs = []
+        self._ids = []
+
+    def store(self):
+        if not self._opened:
+            self.vectorstore = self._open_store()
+            self._opened = True
+        return self.vectorstore
+
+    def add(self, docs, ids):
+        self._docs.extend(docs)
+        self._ids.extend(ids)
+        while len(self._docs) >= self.batch_size:
+            self._flush(self.batch_size)
+
+    def finish(self):
+        if self._docs:
+            self._flush(len(self._docs))
+        return self.store()
+
+    def _flush(self, n: int):
+        docs, self._docs = self._docs[:n], self._docs[n:]
+        ids, self._ids = self._ids[:n], self._ids[n:]
+        texts = [doc.page_content for doc in docs]
+        metadatas = [doc.metadata for doc in docs]
+
+        started = time.perf_counter()
+        with span("ingest_embed_batch", chunks=len(texts)):
+            vectors = self.embeddings.embed_documents(texts)
+        self.stats.embed_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with span("ingest_index_batch", chunks=len(texts)):
+            self._append(texts, vectors, metadatas, ids)
+        self.stats.index_seconds += time.perf_counter() - started
+        self.stats.batches += 1
+
+    def _append(self, texts, vectors, metadatas, ids):
+        vectorstore = self.store()
+        if vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(
+                list(zip(texts, vectors)),
+                self.embeddings,
+                metadatas=metadatas,
+                ids=ids
+            )
+        else:
+            vectorstore.add_embeddings(
+                list(zip(texts, vectors)),
+                metadatas=metadatas,
+                ids=ids
+            )
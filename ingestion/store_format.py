@@ -0,0 +1,244 @@
+"""
+On-disk format of one vector store partition, replacing FAISS.save_local's
+pickled docstore.
+
+    store.json              header: format version, generation, file checksums
+    index-<gen>.faiss       FAISS index (memory-mapped by readers)
+    chunks-<gen>.bin        concatenated JSON records {"text", "metadata"}
+    offsets-<gen>.npy       int64 record offsets into chunks-<gen>.bin
+    ids-<gen>.json          docstore id of every index position
+
+Data files of a save carry a fresh generation in their name and the header
+is replaced last, so readers see either the old or the new store, never a
+mix. Checksums in the header catch truncated or hand-edited files.
+"""
+import hashlib
+import json
+import mmap
+import os
+import time
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+HEADER_FILE = "store.json"
+STORE_FORMAT = "rag-vector-store"
+STORE_FORMAT_VERSION = 1
+
+# Files written by FAISS.save_local; migrated on the next save
+LEGACY_FILES = ("index.faiss", "index.pkl")
+
+# STORE_VERIFY_CHECKSUMS=0 only checks file sizes when loading
+VERIFY_CHECKSUMS = os.getenv("STORE_VERIFY_CHECKSUMS", "1") != "0"
+
+
+class CorruptStoreError(Exception):
+    """The partition on disk is incomplete, damaged or of an unknown version."""
+
+
+class LazyDocstore(Docstore, AddableMixin):
+    """
+    Docstore backed by the memory-mapped chunk file: a chunk's text and
+    metadata are decoded only when a search returns it. Chunks added after
+    loading live in memory until save_store writes them out with the rest.
+    """
+
+    def __init__(self, chunks_path: str, offsets_path: str, ids: list[str]):
+        self._file = open(chunks_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._chunks = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets = np.load(offsets_path, mmap_mode="r")
+        self._positions = {doc_id: i for i, doc_id in enumerate(ids)}
+        # Named like InMemoryDocstore's dict so memory estimates see new chunks
+        self._dict = {}
+
+    def _read(self, position: int) -> Document:
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        record = json.loads(self._chunks[start:end])
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    def search(self, search: str):
+        if search in self._dict:
+            return self._dict[search]
+        position = self._positions.get(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self._read(position)
+
+    def add(self, texts: dict):
+        existing = [doc_id for doc_id in texts if doc_id in self._dict or doc_id in self._positions]
+        if existing:
+            raise ValueError(f"Tried to add ids that already exist: {existing}")
+        self._dict.update(texts)
+
+    def delete(self, ids: list):
+        for doc_id in ids:
+            self._dict.pop(doc_id, None)
+            self._positions.pop(doc_id, None)
+
+
+def _digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _describe(path: str) -> dict:
+    return {"name": os.path.basename(path), "size": os.path.getsize(path), "sha256": _digest(path)}
+
+
+def _fsync(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def has_store(store_path: str) -> bool:
+    return os.path.exists(os.path.join(store_path, HEADER_FILE))
+
+
+def save_store(vectorstore, store_path: str) -> str:
+    """Write the store under a new generation and switch the header to it."""
+    os.makedirs(store_path, exist_ok=True)
+    generation = f"{time.time_ns():x}"
+    index = vectorstore.index
+
+    paths = {
+        "index": os.path.join(store_path, f"index-{generation}.faiss"),
+        "chunks": os.path.join(store_path, f"chunks-{generation}.bin"),
+        "offsets": os.path.join(store_path, f"offsets-{generation}.npy"),
+        "ids": os.path.join(store_path, f"ids-{generation}.json"),
+    }
+
+    faiss.write_index(index, paths["index"])
+
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(index.ntotal)]
+    offsets = [0]
+    with open(paths["chunks"], "wb") as f:
+        for doc_id in ids:
+            doc = vectorstore.docstore.search(doc_id)
+            record = json.dumps(
+                {"text": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False, default=str
+            ).encode("utf-8")
+            f.write(record)
+            offsets.append(offsets[-1] + len(record))
+
+    with open(paths["offsets"], "wb") as f:
+        np.save(f, np.asarray(offsets, dtype="int64"))
+    with open(paths["ids"], "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+
+    for path in paths.values():
+        _fsync(path)
+
+    header = {
+        "format": STORE_FORMAT,
+        "version": STORE_FORMAT_VERSION,
+        "generation": generation,
+        "count": index.ntotal,
+        "dim": index.d,
+        "files": {role: _describe(path) for role, path in paths.items()},
+    }
+    header_path = os.path.join(store_path, HEADER_FILE)
+    tmp_path = f"{header_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, header_path)
+
+    # Readers that already mapped old files keep them until they close
+    current = {os.path.basename(path) for path in paths.values()}
+    for name in os.listdir(store_path):
+        role, generation_sep, _ = name.partition("-")
+        stale = generation_sep and role in paths and name not in current
+        if stale or name in LEGACY_FILES:
+            try:
+                os.remove(os.path.join(store_path, name))
+            except OSError:
+                pass
+
+    return generation
+
+
+def read_header(store_path: str) -> dict:
+    try:
+        with open(os.path.join(store_path, HEADER_FILE), "r", encoding="utf-8") as f:
+            header = json.load(f)
+    except ValueError as e:
+        raise CorruptStoreError(f"Unreadable store header in {store_path}: {e}")
+
+    if header.get("format") != STORE_FORMAT or header.get("version") != STORE_FORMAT_VERSION:
+        raise CorruptStoreError(
+            f"Unsupported store format in {store_path}: "
+            f"{header.get('format')} v{header.get('version')}"
+        )
+    return header
+
+
+def _verify(store_path: str, header: dict, checksums: bool) -> dict:
+    paths = {}
+    for role, expected in header["files"].items():
+        path = os.path.join(store_path, expected["name"])
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        if os.path.getsize(path) != expected["size"]:
+            raise CorruptStoreError(f"{path} is {os.path.getsize(path)} bytes, expected {expected['size']}")
+        if checksums and _digest(path) != expected["sha256"]:
+            raise CorruptStoreError(f"Checksum mismatch for {path}")
+        paths[role] = path
+    return paths
+
+
+def load_store(store_path: str, embeddings, mmap_index: bool = False,
+               verify: bool = VERIFY_CHECKSUMS, retries: int = 3):
+    """
+    Open a partition as a LangChain FAISS store with a lazy docstore.
+
+    `mmap_index=True` maps the index read-only (query path); ingestion
+    loads it into memory because it mutates the index. Raises
+    CorruptStoreError when the files don't match their header.
+    """
+    if not has_store(store_path):
+        return _load_legacy(store_path, embeddings)
+
+    for attempt in range(retries):
+        header = read_header(store_path)
+        try:
+            paths = _verify(store_path, header, verify)
+            with open(paths["ids"], "r", encoding="utf-8") as f:
+                ids = json.load(f)
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap_index else 0
+            index = faiss.read_index(paths["index"], flags)
+            docstore = LazyDocstore(paths["chunks"], paths["offsets"], ids)
+            break
+        except FileNotFoundError:
+            # A concurrent save replaced this generation; read the new header
+            if attempt == retries - 1:
+                raise CorruptStoreError(f"Store files listed in {store_path}/{HEADER_FILE} are missing")
+
+    if index.ntotal != header["count"] or len(ids) != header["count"]:
+        raise CorruptStoreError(f"{store_path} holds {index.ntotal} vectors, header says {header['count']}")
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+
+def _load_legacy(store_path: str, embeddings):
+    """Pickle-based save_local output from before this format; rewritten on next ingest."""
+    if not all(os.path.exists(os.path.join(store_path, name)) for name in LEGACY_FILES):
+        raise FileNotFoundError(f"No vector store in {store_path}")
+
+    print(f"[WARN] Loading legacy pickled vector store {store_path}; re-save to migrate")
+    return FAISS.load_local(store_path, embeddings, allow_dangerous_deserialization=True)
@@ -0,0 +1,26 @@
+import os
+import time
+
+VERSION_FILE = "VERSION"
+
+
+def read_index_version(store_path: str):
+    """Return the version stamp of the index at `store_path`, or None."""
+    try:
+        with open(os.path.join(store_path, VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def bump_index_version(store_path: str) -> str:
+    """Write a fresh version stamp so readers know the index changed."""
+    version = str(time.time_ns())
+    stamp_path = os.path.join(store_path, VERSION_FILE)
+    tmp_path = f"{stamp_path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, stamp_path)
+
+    return version
@@ -0,0 +1,190 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from ingestion.embedder import get_embeddings
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "86400"))
+
+# Cosine similarity above which a differently worded question reuses an
+# answer. Off (0) by default: only exact (normalized) matches are served
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+# Order numbers, sizes, SKUs and other codes: anything with a digit, or
+# letters and digits joined by - _ /
+_ENTITY_TOKEN = re.compile(r"[a-z0-9]+(?:[-_/][a-z0-9]+)+|\w*\d\w*")
+
+
+# Normalized queries whose embeddings are memoized, so the answer cache
+# and the FAQ store embed each question once
+QUERY_EMBEDDING_MEMO_SIZE = 1024
+
+_query_vectors = OrderedDict()
+_query_vectors_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+
+def entity_tokens(normalized: str) -> frozenset:
+    """
+    Code-like tokens of a normalized query. Questions that differ only in
+    these embed almost identically, so a similarity match also requires
+    the same set.
+    """
+    return frozenset(_ENTITY_TOKEN.findall(normalized))
+
+
+def embed_normalized(normalized: str) -> np.ndarray:
+    """Unit-length embedding of an already normalized query (memoized)."""
+    embeddings = get_embeddings()
+    key = (id(embeddings), normalized)
+    with _query_vectors_lock:
+        vector = _query_vectors.get(key)
+        if vector is not None:
+            _query_vectors.move_to_end(key)
+            return vector
+
+    vector = np.asarray(embeddings.embed_query(normalized), dtype="float32")
+    norm = np.linalg.norm(vector)
+    vector = vector / norm if norm else vector
+
+    with _query_vectors_lock:
+        _query_vectors[key] = vector
+        while len(_query_vectors) > QUERY_EMBEDDING_MEMO_SIZE:
+            _query_vectors.popitem(last=False)
+    return vector
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of final answers keyed by
+    (business_id, role, index version, normalized query).
+
+    Entries from an older index version can never match and are dropped as
+    soon as a newer version is seen, so re-ingestion invalidates the cache.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = ANSWER_CACHE_TTL_S,
+                 similarity: float = ANSWER_CACHE_SIMILARITY,
+                 embed_query=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._embed_query = embed_query
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _embed(self, query: str):
+        if self._embed_query is None:
+            return embed_normalized(query)
+        vector = np.asarray(self._embed_query(query), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry, now) -> bool:
+        return now - entry["stored_at"] > self.ttl_seconds
+
+    def _drop_stale_versions(self, business_id: str, version):
+        stale = [
+            key for key in self._entries
+            if key[0] == business_id and key[2] != version
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    def _hit(self, key, entry, semantic: bool = False):
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.semantic_hits += semantic
+        self.saved_seconds += entry["latency_s"]
+        return entry["answer"]
+
+    def get(self, business_id: str, role: str, version, query: str):
+        normalized = normalize_query(query)
+        key = (business_id, role, version, normalized)
+        now = time.monotonic()
+
+        with self._lock:
+            self._drop_stale_versions(business_id, version)
+
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                return self._hit(key, entry)
+
+        if self.similarity <= 0:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        vector = self._embed(normalized)
+        entities = entity_tokens(normalized)
+
+        with self._lock:
+            best_key, best_score = None, self.similarity
+            for other_key, other in self._entries.items():
+                if other_key[:3] != key[:3] or self._expired(other, now):
+                    continue
+                if other["entities"] != entities:
+                    continue
+                score = float(np.dot(vector, other["vector"]))
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+
+            if best_key is not None:
+                return self._hit(best_key, self._entries[best_key], semantic=True)
+
+            self.misses += 1
+            return None
+
+    def put(self, business_id: str, role: str, version, query: str, answer: str,
+            latency_s: float):
+        normalized = normalize_query(query)
+        vector = self._embed(normalized) if self.similarity > 0 else None
+
+        with self._lock:
+            key = (business_id, role, version, normalized)
+            self._entries[key] = {
+                "answer": answer,
+                "vector": vector,
+                "entities": entity_tokens(normalized),
+                "latency_s": latency_s,
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+
+_answer_cache = AnswerCache()
+
+
+def get_answer_cache() -> AnswerCache:
+    return _answer_cache
@@ -1,31 +1,175 @@
-from langchain.chains import RetrievalQA
-from rag.prompts import RAG_PROMPT
-from rag.llm_factory import get_primary_llm, get_fallback_llm
-
-def build_rag_chain(retriever, llm):
-    return RetrievalQA.from_chain_type(
-        llm=llm,
-        retriever=retriever,
-        chain_type="stuff",
-        chain_type_kwargs={
-            "prompt": RAG_PROMPT
-        },
-        return_source_documents=False
-    )
-
-def run_rag(retriever, query: str, role=None):
-    """Run RAG pipeline with primary LLM and fallback support"""
-    try:
-        chain = build_rag_chain(retriever, get_primary_llm())
-        return chain.run({
-            "query": query,
-            "role": "user"
-        })
-    except Exception as e:
-        print(f"[WARN] Primary LLM failed: {e}")
-        fallback_llm = get_fallback_llm()
-        if fallback_llm:
-            fallback_chain = build_rag_chain(retriever, fallback_llm)
-            return fallback_chain.run(query)
+import threading
+import time
+from collections import deque
+from rag.prompts import NO_ANSWER, RAG_PROMPT
+from rag.llm_factory import get_provider_pool
+from rag.context import pack_context
+from utils.tracing import span
+
+# Questions checked against a confidence gate, and how many skipped the LLM
+GATE_STATS = {"checked": 0, "skipped_llm": 0}
+_gate_stats_lock = threading.Lock()
+
+
+def gate_stats() -> dict:
+    with _gate_stats_lock:
+        return dict(GATE_STATS)
+
+
+def retrieve(retriever, query: str):
+    """Return (docs, top similarity); the similarity is None if the retriever has no scores."""
+    with span("retrieval", k=getattr(retriever, "k", None)) as s:
+        if hasattr(retriever, "search_with_scores"):
+            hits, top = retriever.search_with_scores(query)
+            docs = [doc for doc, _ in hits]
         else:
-            raise e
+            docs, top = retriever.invoke(query), None
+        s.set(docs=len(docs), top_similarity=round(top, 4) if top is not None else None)
+    return docs, top
+
+
+def below_confidence(retriever, top_similarity) -> bool:
+    """True when the best match is under the retriever's gate, so the LLM is skipped."""
+    threshold = getattr(retriever, "min_similarity", None)
+    if threshold is None or top_similarity is None:
+        return False
+
+    with span("gate", top_similarity=round(top_similarity, 4), threshold=threshold) as s:
+        gated = top_similarity < threshold
+        s.set(skipped_llm=gated)
+    with _gate_stats_lock:
+        GATE_STATS["checked"] += 1
+        GATE_STATS["skipped_llm"] += gated
+    if gated:
+        print(f"🚧 Low retrieval confidence ({top_similarity:.3f} < {threshold}), skipping LLM")
+    return gated
+
+
+def build_prompt(docs, query: str, role: str = "user") -> str:
+    """Fill in RAG_PROMPT with the retrieved docs."""
+    with span("prompt") as s:
+        # Merge neighbours, drop duplicates, trim to the token budget
+        context, stats = pack_context(docs)
+        s.set(**stats)
+        if stats["context_tokens_saved"] > 0:
+            print(f"✂️ Context packed: {stats}")
+        prompt = RAG_PROMPT.format(
+            context=context,
+            question=query,
+            role=role
+        )
+        # ~4 characters per token for English text
+        s.set(prompt_chars=len(prompt), prompt_tokens_est=len(prompt) // 4)
+    return prompt
+
+def _complete(llm, prompt: str) -> str:
+    with span("llm", model=type(llm).__name__) as s:
+        result = llm.invoke(prompt)
+        usage = getattr(result, "usage_metadata", None)
+        if usage:
+            s.set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+    # Chat models return messages, plain LLMs return strings
+    return getattr(result, "content", result)
+
+def run_rag(retriever, query: str, role: str = "user", llm=None):
+    """
+    Run the RAG pipeline. The answer comes from the provider pool (hedging,
+    circuit breaking and failover across providers) unless `llm` is given.
+    Questions below the retriever's confidence gate get NO_ANSWER without
+    an LLM call.
+    """
+    docs, top = retrieve(retriever, query)
+    if below_confidence(retriever, top):
+        return NO_ANSWER
+    prompt = build_prompt(docs, query, role)
+
+    if llm is not None:
+        return _complete(llm, prompt)
+
+    with span("llm") as s:
+        provider, result = get_provider_pool().invoke(prompt)
+        s.set(provider=provider)
+        usage = getattr(result, "usage_metadata", None)
+        if usage:
+            s.set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+    return getattr(result, "content", result)
+
+
+class StreamStats:
+    """Latency of one streamed answer. Stream chunks are counted as tokens."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.tokens = 0
+
+    def on_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def as_dict(self) -> dict:
+        ttft = None
+        tokens_per_s = None
+        if self.first_token_at is not None:
+            ttft = self.first_token_at - self.started
+            generation = (self.finished_at or time.perf_counter()) - self.first_token_at
+            if generation > 0:
+                tokens_per_s = self.tokens / generation
+
+        return {
+            "time_to_first_token_s": round(ttft, 3) if ttft is not None else None,
+            "tokens": self.tokens,
+            "tokens_per_s": round(tokens_per_s, 1) if tokens_per_s is not None else None,
+        }
+
+
+# Most recent per-request streaming stats, newest last
+STREAM_METRICS = deque(maxlen=200)
+
+
+def _stream_llm(llm, prompt: str):
+    for chunk in llm.stream(prompt):
+        # Chat models yield message chunks, plain LLMs yield strings
+        text = getattr(chunk, "content", chunk)
+        if text:
+            yield text
+
+
+def stream_rag(retriever, query: str, role: str = "user", llm=None):
+    """
+    Stream the answer token by token.
+
+    Retrieval runs once. Providers are raced to the first token by the
+    provider pool; once output has reached the user the answer stays on
+    that provider. Pass `llm` to use a specific model, e.g. `get_fake_llm()`
+    for local testing.
+    """
+    stats = StreamStats()
+
+    docs, top = retrieve(retriever, query)
+    if below_confidence(retriever, top):
+        yield NO_ANSWER
+        return
+
+    prompt = build_prompt(docs, query, role)
+
+    if llm is not None:
+        tokens, model = _stream_llm(llm, prompt), type(llm).__name__
+    else:
+        tokens, model = get_provider_pool().stream(prompt), "pool"
+
+    with span("llm", model=model, stream=True) as s:
+        for text in tokens:
+            stats.on_token()
+            yield text
+        s.set(**stats.as_dict())
+
+    stats.finish()
+    metrics = stats.as_dict()
+    STREAM_METRICS.append(metrics)
+    print(f"⚡ Streamed answer: {metrics}")
@@ -0,0 +1,125 @@
+import os
+import re
+from langchain_core.documents import Document
+
+# Upper bound on context tokens pasted into the prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Chunks whose word shingles overlap at least this much are duplicates
+DUPLICATE_JACCARD = 0.8
+
+# Don't bother squeezing in a truncated passage shorter than this
+MIN_PASSAGE_TOKENS = 40
+
+SHINGLE_SIZE = 3
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text with the Llama tokenizer
+    return max(1, len(text) // 4)
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _span(doc: Document):
+    """(source, page, start, end) when the chunker recorded offsets."""
+    start = doc.metadata.get("start_index")
+    if start is None:
+        return None
+    return (
+        doc.metadata.get("source"),
+        doc.metadata.get("page"),
+        start,
+        start + len(doc.page_content),
+    )
+
+
+def _merge_adjacent(docs: list[Document]) -> list[Document]:
+    """
+    Merge chunks that overlap or touch in the same source (and page) into
+    one passage, dropping the repeated overlap. The merged passage keeps
+    the rank of its best-ranked piece.
+    """
+    merged = []
+    for doc in docs:
+        span = _span(doc)
+        for i, passage in enumerate(merged):
+            other = _span(passage)
+            if span is None or other is None or span[:2] != other[:2]:
+                continue
+            if span[2] > other[3] or other[2] > span[3]:
+                continue
+
+            first, second = (passage, doc) if other[2] <= span[2] else (doc, passage)
+            first_span, second_span = _span(first), _span(second)
+            overlap = first_span[3] - second_span[2]
+            text = first.page_content + second.page_content[overlap:]
+            if second_span[3] <= first_span[3]:
+                text = first.page_content
+
+            merged[i] = Document(
+                page_content=text,
+                metadata={**first.metadata, "start_index": first_span[2]}
+            )
+            break
+        else:
+            merged.append(doc)
+    return merged
+
+
+def _drop_duplicates(docs: list[Document]) -> list[Document]:
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(_jaccard(shingles, other) >= DUPLICATE_JACCARD for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def pack_context(docs: list[Document], budget_tokens: int = CONTEXT_TOKEN_BUDGET):
+    """
+    Turn ranked chunks into the prompt context: merge neighbouring chunks,
+    drop near-duplicates, then keep the best passages that fit the token
+    budget (truncating the last one if enough room is left).
+
+    Returns (context, stats) where stats reports tokens before and after.
+    """
+    raw_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+
+    passages = _drop_duplicates(_merge_adjacent(docs))
+
+    packed, used = [], 0
+    for doc in passages:
+        tokens = estimate_tokens(doc.page_content)
+        remaining = budget_tokens - used
+        if tokens <= remaining:
+            packed.append(doc.page_content)
+            used += tokens
+        elif remaining >= MIN_PASSAGE_TOKENS:
+            packed.append(doc.page_content[:remaining * 4])
+            used += remaining
+            break
+        else:
+            break
+
+    stats = {
+        "chunks_in": len(docs),
+        "passages_out": len(packed),
+        "context_tokens_in": raw_tokens,
+        "context_tokens_out": used,
+        "context_tokens_saved": raw_tokens - used,
+    }
+    return "\n\n".join(packed), stats
@@ -0,0 +1,310 @@
+import contextvars
+import os
+import threading
+from collections import OrderedDict, deque
+
+# Answers generated at once across all tenants; more requests wait in line
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "8"))
+
+# Requests allowed to wait, in total and per tenant; beyond that they are shed
+RAG_MAX_QUEUE = int(os.getenv("RAG_MAX_QUEUE", "32"))
+RAG_MAX_QUEUE_PER_TENANT = int(os.getenv("RAG_MAX_QUEUE_PER_TENANT", "8"))
+
+# Longest a request waits for a slot before it is shed
+RAG_QUEUE_TIMEOUT_S = float(os.getenv("RAG_QUEUE_TIMEOUT_S", "10"))
+
+# RAG_COALESCE=0 gives every request its own computation
+COALESCE_ENABLED = os.getenv("RAG_COALESCE", "1") != "0"
+
+BUSY_MESSAGE = "We're getting a lot of questions right now. Please try again in a moment."
+
+
+class Overloaded(Exception):
+    """The request was shed instead of queued; safe to retry shortly."""
+
+
+class FairLimiter:
+    """
+    At most `concurrency` requests run at once. Waiting requests are kept in
+    one queue per tenant and slots are handed out round-robin across
+    tenants, so a burst from one business cannot starve the others. A
+    request is shed with `Overloaded` when its tenant's queue or the total
+    queue is full, or when it waited longer than `timeout_s`.
+    """
+
+    def __init__(self, concurrency: int = RAG_MAX_CONCURRENCY, max_queue: int = RAG_MAX_QUEUE,
+                 max_queue_per_tenant: int = RAG_MAX_QUEUE_PER_TENANT,
+                 timeout_s: float = RAG_QUEUE_TIMEOUT_S):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self.timeout_s = timeout_s
+        self.active = 0
+        self.queued = 0
+        self.shed = 0
+        self.timeouts = 0
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, tenant: str):
+        with self._lock:
+            if self.active < self.concurrency and not self.queued:
+                self.active += 1
+                return
+
+            waiting = self._queues.get(tenant, ())
+            if self.queued >= self.max_queue or len(waiting) >= self.max_queue_per_tenant:
+                self.shed += 1
+                raise Overloaded(f"Too many requests queued for {tenant}")
+
+            waiter = threading.Event()
+            self._queues.setdefault(tenant, deque()).append(waiter)
+            self.queued += 1
+
+        if waiter.wait(self.timeout_s):
+            return
+
+        with self._lock:
+            # Granted between the timeout and taking the lock
+            if waiter.is_set():
+                return
+            waiting = self._queues[tenant]
+            waiting.remove(waiter)
+            if not waiting:
+                del self._queues[tenant]
+            self.queued -= 1
+            self.timeouts += 1
+        raise Overloaded(f"Waited more than {self.timeout_s}s for a free slot")
+
+    def release(self):
+        with self._lock:
+            if not self._queues:
+                self.active -= 1
+                return
+
+            # The slot passes straight to the next tenant in turn, which
+            # then moves to the back of the rotation
+            tenant, waiting = self._queues.popitem(last=False)
+            waiter = waiting.popleft()
+            if waiting:
+                self._queues[tenant] = waiting
+            self.queued -= 1
+        waiter.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self.active,
+                "queued": self.queued,
+                "queued_by_tenant": {t: len(w) for t, w in self._queues.items()},
+                "shed": self.shed,
+                "queue_timeouts": self.timeouts,
+            }
+
+
+class _Flight:
+    """One in-flight call whose result is shared by every caller that joined."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _StreamFlight:
+    """
+    One in-flight token stream shared by several consumers.
+
+    Tokens are buffered so late joiners replay what they missed. There is
+    no fixed leader: whichever consumer needs a token nobody has produced
+    yet pulls it from the source, so the stream keeps going if the consumer
+    that started it disconnects. The source is closed once every consumer
+    has left.
+    """
+
+    def __init__(self, source, on_finish):
+        self.source = source
+        self.tokens = []
+        self.finished = False
+        self.abandoned = False
+        self.error = None
+        self._pulling = False
+        self._consumers = 0
+        self._on_finish = on_finish
+        self._cond = threading.Condition()
+        # Every pull runs in the starting request's context, so its trace
+        # collects the spans whichever thread does the pulling
+        self._context = contextvars.copy_context()
+
+    def join(self) -> bool:
+        with self._cond:
+            if self.abandoned:
+                return False
+            self._consumers += 1
+            return True
+
+    def _finish(self, error=None):
+        with self._cond:
+            self.finished = True
+            self.error = error
+            self._pulling = False
+            self._cond.notify_all()
+        self._on_finish()
+
+    def _pull(self):
+        try:
+            token = self._context.run(next, self.source)
+        except StopIteration:
+            self._finish()
+        except BaseException as e:
+            self._finish(e)
+        else:
+            with self._cond:
+                self.tokens.append(token)
+                self._pulling = False
+                self._cond.notify_all()
+
+    def _leave(self):
+        with self._cond:
+            self._consumers -= 1
+            if self._consumers or self.finished:
+                return
+            self.abandoned = True
+        self._context.run(self.source.close)
+        self._finish(GeneratorExit())
+
+    def consume(self):
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    while index >= len(self.tokens) and not self.finished and self._pulling:
+                        self._cond.wait()
+                    if index < len(self.tokens):
+                        token = self.tokens[index]
+                    elif self.finished:
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    else:
+                        self._pulling = True
+                        token = None
+
+                if token is None:
+                    self._pull()
+                    continue
+                index += 1
+                yield token
+        finally:
+            self._leave()
+
+
+class RequestCoordinator:
+    """
+    Front door for answer generation.
+
+    Identical requests that are in flight at the same time (same business,
+    role, index version and normalized query) share one computation; only
+    that computation takes a slot from the fair limiter, so a burst of the
+    same question costs one retrieval and one LLM call.
+    """
+
+    def __init__(self, limiter: FairLimiter | None = None, coalesce: bool = COALESCE_ENABLED):
+        self.limiter = limiter or FairLimiter()
+        self.coalesce = coalesce
+        self.computed = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _limited(self, tenant: str, fn):
+        self.limiter.acquire(tenant)
+        try:
+            return fn()
+        finally:
+            self.limiter.release()
+
+    def _limited_stream(self, tenant: str, produce):
+        self.limiter.acquire(tenant)
+        try:
+            yield from produce()
+        finally:
+            self.limiter.release()
+
+    def run(self, tenant: str, key: tuple, fn):
+        """Return fn(), sharing the call with identical in-flight requests."""
+        if not self.coalesce:
+            self.computed += 1
+            return self._limited(tenant, fn)
+
+        key = ("call",) + key
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.computed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            flight.result = self._limited(tenant, fn)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+        return flight.result
+
+    def stream(self, tenant: str, key: tuple, produce):
+        """Yield the tokens of produce(), shared with identical in-flight streams."""
+        if not self.coalesce:
+            self.computed += 1
+            yield from self._limited_stream(tenant, produce)
+            return
+
+        key = ("stream",) + key
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.join():
+                self.coalesced += 1
+            else:
+                flight = _StreamFlight(self._limited_stream(tenant, produce),
+                                       lambda: self._forget(key))
+                flight.join()
+                self._inflight[key] = flight
+                self.computed += 1
+
+        yield from flight.consume()
+
+    def _forget(self, key: tuple):
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.finished:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            **self.limiter.stats(),
+        }
+
+
+_coordinator = RequestCoordinator()
+
+
+def get_coordinator() -> RequestCoordinator:
+    return _coordinator
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+import numpy as np
+from app.tenants import business_exists, load_business_config
+from ingestion.versioning import read_index_version
+from rag.cache import embed_normalized, entity_tokens, normalize_query
+from rag.registry import VECTOR_DB_PATH
+from rag.retriever import ROLE_PARTITIONS
+from utils.file_utils import file_lock
+
+# FAQ_STORE=0 turns precomputed answers off
+FAQ_ENABLED = os.getenv("FAQ_STORE", "1") != "0"
+
+# Cosine similarity at which a question is served the stored answer of an
+# FAQ entry, until business.json sets a calibrated "faq": {"min_similarity": ...}
+# (python -m rag.gate_calibration). Answers skip retrieval, so err strict
+FAQ_SIMILARITY = float(os.getenv("FAQ_SIMILARITY", "0.97"))
+
+# When set, every answered question is appended here as one JSON line, for
+# mining FAQ candidates (python -m ingestion.build_faq --from-log)
+QUERY_LOG = os.getenv("RAG_QUERY_LOG")
+
+FAQ_FILE = "faq.json"
+FAQ_LOCK_FILE = ".faq.lock"
+FORMAT = "rag-faq"
+FORMAT_VERSION = 1
+
+_query_log_lock = threading.Lock()
+
+
+def role_version(business_id: str, role: str, base_path: str = VECTOR_DB_PATH) -> str:
+    """Version stamp of the partitions `role` answers from."""
+    return "/".join(
+        f"{access}:{read_index_version(os.path.join(base_path, business_id, access))}"
+        for access in ROLE_PARTITIONS.get(role, ROLE_PARTITIONS["user"])
+    )
+
+
+def load_faq_similarity(business_id: str) -> float:
+    faq = {}
+    if business_exists(business_id):
+        faq = load_business_config(business_id).get("faq", {})
+    return float(faq.get("min_similarity", FAQ_SIMILARITY))
+
+
+def log_query(business_id: str, role: str, query: str):
+    if not QUERY_LOG:
+        return
+    line = json.dumps({"ts": time.time(), "business_id": business_id, "role": role, "query": query})
+    with _query_log_lock, open(QUERY_LOG, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def mine_questions(log_path: str, business_id: str, top: int) -> list[dict]:
+    """The `top` most asked (normalized) questions in a query log, in their most common wording."""
+    counts = Counter()
+    wordings = defaultdict(Counter)
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("business_id") != business_id:
+                continue
+            key = (record.get("role", "user"), normalize_query(record["query"]))
+            counts[key] += 1
+            wordings[key][record["query"].strip()] += 1
+
+    return [
+        {"question": wordings[key].most_common(1)[0][0], "role": key[0], "asked": n}
+        for key, n in counts.most_common(top)
+    ]
+
+
+class FaqMatch:
+    def __init__(self, entry: dict, similarity: float, stale: bool):
+        self.entry = entry
+        self.similarity = similarity
+        self.stale = stale
+
+    @property
+    def question(self) -> str:
+        return self.entry["question"]
+
+    @property
+    def answer(self) -> str:
+        return self.entry["answer"]
+
+
+class FaqStore:
+    """
+    Precomputed answers for one business, in vector_db/<business_id>/faq.json.
+
+    Each entry records the index version of the partitions its role reads,
+    so entries answered before a re-ingest are reported as stale instead of
+    served. Lookup is an exact normalized-question match, then a dot product
+    against the (small) matrix of entry vectors for paraphrases that
+    mention the same order numbers, sizes and SKUs.
+    """
+
+    def __init__(self, business_id: str, entries: list[dict] | None = None,
+                 base_path: str = VECTOR_DB_PATH):
+        self.business_id = business_id
+        self.base_path = base_path
+        self.entries = []
+        self._exact = {}
+        self._vectors = {}
+        for entry in entries or []:
+            self._add(entry)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.base_path, self.business_id, FAQ_FILE)
+
+    def _add(self, entry: dict):
+        key = (entry["role"], normalize_query(entry["question"]))
+        if key in self._exact:
+            self.entries[self.entries.index(self._exact[key])] = entry
+        else:
+            self.entries.append(entry)
+        self._exact[key] = entry
+        self._vectors.pop(entry["role"], None)
+
+    def _matrix(self, role: str):
+        if role not in self._vectors:
+            rows = [e for e in self.entries if e["role"] == role]
+            vectors = np.asarray([e["vector"] for e in rows], dtype="float32") if rows else None
+            entities = [entity_tokens(normalize_query(e["question"])) for e in rows]
+            self._vectors[role] = (rows, vectors, entities)
+        return self._vectors[role]
+
+    def upsert(self, question: str, role: str, answer: str, index_version: str, vector=None):
+        if vector is None:
+            vector = embed_normalized(normalize_query(question))
+        self._add({
+            "question": question,
+            "role": role,
+            "answer": answer,
+            "index_version": index_version,
+            "generated_at": time.time(),
+            "vector": [round(float(x), 6) for x in vector],
+        })
+
+    def get(self, role: str, question: str) -> dict | None:
+        """The entry stored for exactly this (normalized) question."""
+        return self._exact.get((role, normalize_query(question)))
+
+    def is_stale(self, entry: dict) -> bool:
+        return entry["index_version"] != role_version(self.business_id, entry["role"], self.base_path)
+
+    def lookup(self, role: str, query: str, similarity: float = FAQ_SIMILARITY) -> FaqMatch | None:
+        normalized = normalize_query(query)
+        entry = self._exact.get((role, normalized))
+        score = 1.0
+        if entry is None:
+            rows, vectors, entities = self._matrix(role)
+            query_entities = entity_tokens(normalized)
+            candidates = [i for i, e in enumerate(entities) if e == query_entities]
+            if not candidates:
+                return None
+            scores = vectors[candidates] @ np.asarray(embed_normalized(normalized), dtype="float32")
+            best = int(np.argmax(scores))
+            if scores[best] < similarity:
+                return None
+            entry, score = rows[candidates[best]], float(scores[best])
+
+        return FaqMatch(entry, score, self.is_stale(entry))
+
+    def stale_entries(self) -> list[dict]:
+        current = {}
+        stale = []
+        for entry in self.entries:
+            role = entry["role"]
+            if role not in current:
+                current[role] = role_version(self.business_id, role, self.base_path)
+            if entry["index_version"] != current[role]:
+                stale.append(entry)
+        return stale
+
+    @classmethod
+    def load(cls, business_id: str, base_path: str = VECTOR_DB_PATH) -> "FaqStore":
+        store = cls(business_id, base_path=base_path)
+        try:
+            with open(store.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return store
+
+        if data.get("format") != FORMAT or data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported FAQ store format in {store.path}")
+        for entry in data["entries"]:
+            store._add(entry)
+        return store
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT, "version": FORMAT_VERSION, "entries": self.entries}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "stale": len(self.stale_entries())}
+
+
+def update_faq_store(business_id: str, update, base_path: str = VECTOR_DB_PATH):
+    """Apply `update(store)` to the on-disk store under the FAQ writer lock."""
+    with file_lock(os.path.join(base_path, business_id, FAQ_LOCK_FILE)):
+        store = FaqStore.load(business_id, base_path)
+        update(store)
+        store.save()
+    with _stores_lock:
+        _stores.pop(business_id, None)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_faq_store(business_id: str) -> FaqStore:
+    """Resident store for a business, reloaded when faq.json changes on disk."""
+    path = os.path.join(VECTOR_DB_PATH, business_id, FAQ_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        mtime = None
+
+    cached = _stores.get(business_id)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    store = FaqStore.load(business_id)
+    with _stores_lock:
+        _stores[business_id] = (mtime, store)
+    return store
+
+
+def refresh_entry(business_id: str, match: FaqMatch, answer: str, version: str):
+    """Write back an answer regenerated for a stale entry at index `version`."""
+    role = match.entry["role"]
+    vector = match.entry["vector"]
+    update_faq_store(
+        business_id,
+        lambda store: store.upsert(match.question, role, answer, version, vector=vector)
+    )
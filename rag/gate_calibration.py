@@ -0,0 +1,177 @@
+"""
+Calibrate a business's retrieval confidence gate on labelled questions.
+
+    python -m rag.gate_calibration urban_threadz --questions gate_questions.jsonl --max-loss 0.02
+
+Each line of the questions file is {"question": "...", "answerable": true}
+with an optional "role" (default "user"). Every question is retrieved once;
+thresholds are then swept over the same gate signal the retriever serves
+(the best-match similarity, or none for questions whose top keyword hit
+matches a code such as a SKU, which the gate lets through) to report the
+share of LLM calls the gate would save against the share of answerable
+questions it would turn away. The recommended threshold saves the most
+calls while keeping answer loss within --max-loss; --write stores it in
+the business.json "retrieval_gate" block.
+
+Lines may also carry "faq": the stored FAQ question that should answer
+them, or null when none should. Those calibrate the FAQ store: thresholds
+are swept over each question's nearest FAQ entry, and the recommended one
+answers the most questions from the store while serving the wrong entry
+to at most --max-wrong of them; --write stores it as "faq".
+"""
+import argparse
+import json
+from app.tenants import business_config_path, load_business_config
+from rag.cache import normalize_query
+from rag.faq import get_faq_store
+from rag.retriever import get_retriever
+
+
+def load_questions(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+    for q in questions:
+        if "question" not in q or "answerable" not in q:
+            raise ValueError(f"Each line needs 'question' and 'answerable': {q}")
+    return questions
+
+
+def top_similarities(business_id: str, questions: list[dict]) -> list[float | None]:
+    """Gate signal per question; None where the gate does not apply."""
+    retrievers = {}
+    scores = []
+    for q in questions:
+        role = q.get("role", "user")
+        if role not in retrievers:
+            retrievers[role] = get_retriever(business_id, role)
+        _, top = retrievers[role].search_with_scores(q["question"])
+        scores.append(top)
+    return scores
+
+
+def sweep(questions: list[dict], scores: list[float | None], step: float = 0.01) -> list[dict]:
+    answerable = sum(1 for q in questions if q["answerable"])
+    unanswerable = len(questions) - answerable
+    known = [s for s in scores if s is not None]
+    if not known:
+        return []
+
+    rows = []
+    threshold = round(min(known) - min(known) % step, 4)
+    while threshold <= max(known) + step:
+        gated = [s is not None and s < threshold for s in scores]
+        lost = sum(1 for q, g in zip(questions, gated) if g and q["answerable"])
+        caught = sum(1 for q, g in zip(questions, gated) if g and not q["answerable"])
+        rows.append({
+            "threshold": threshold,
+            "llm_calls_saved": round(sum(gated) / len(questions), 4),
+            "answer_loss": round(lost / answerable, 4) if answerable else 0.0,
+            "unanswerable_caught": round(caught / unanswerable, 4) if unanswerable else None,
+        })
+        threshold = round(threshold + step, 4)
+    return rows
+
+
+def recommend(rows: list[dict], max_loss: float) -> dict | None:
+    # Most LLM calls saved; among equals the lowest (most lenient) threshold
+    within = [row for row in rows if row["answer_loss"] <= max_loss]
+    return max(within, key=lambda row: (row["llm_calls_saved"], -row["threshold"])) if within else None
+
+
+def faq_matches(business_id: str, questions: list[dict]) -> list[tuple[float, bool] | None]:
+    """(similarity, right entry?) of each FAQ-labelled question's nearest entry."""
+    store = get_faq_store(business_id)
+    matches = []
+    for q in questions:
+        match = store.lookup(q.get("role", "user"), q["question"], similarity=-1.0)
+        if match is None:
+            matches.append(None)
+            continue
+        right = q["faq"] is not None and normalize_query(match.question) == normalize_query(q["faq"])
+        matches.append((match.similarity, right))
+    return matches
+
+
+def faq_sweep(matches: list[tuple[float, bool] | None], step: float = 0.01) -> list[dict]:
+    known = [m[0] for m in matches if m is not None]
+    if not known:
+        return []
+
+    rows = []
+    threshold = round(min(known) - min(known) % step, 4)
+    while threshold <= 1.0:
+        served = [m for m in matches if m is not None and m[0] >= threshold]
+        rows.append({
+            "threshold": threshold,
+            "faq_answered": round(sum(1 for _, right in served if right) / len(matches), 4),
+            "wrong_answers": round(sum(1 for _, right in served if not right) / len(matches), 4),
+        })
+        threshold = round(threshold + step, 4)
+    return rows
+
+
+def recommend_faq(rows: list[dict], max_wrong: float) -> dict | None:
+    # Most questions answered from the store; among equals the strictest threshold
+    within = [row for row in rows if row["wrong_answers"] <= max_wrong]
+    return max(within, key=lambda row: (row["faq_answered"], row["threshold"])) if within else None
+
+
+def write_threshold(business_id: str, threshold: float, block: str = "retrieval_gate"):
+    config = dict(load_business_config(business_id))
+    config[block] = {**config.get(block, {}), "min_similarity": threshold}
+    with open(business_config_path(business_id), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("business_id")
+    parser.add_argument("--questions", required=True, help="JSONL of labelled questions")
+    parser.add_argument("--max-loss", type=float, default=0.0,
+                        help="largest acceptable share of answerable questions gated")
+    parser.add_argument("--max-wrong", type=float, default=0.0,
+                        help="largest acceptable share of FAQ-labelled questions served the wrong entry")
+    parser.add_argument("--step", type=float, default=0.01)
+    parser.add_argument("--write", action="store_true", help="save the recommendations to business.json")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    scores = top_similarities(args.business_id, questions)
+    rows = sweep(questions, scores, args.step)
+    best = recommend(rows, args.max_loss)
+
+    faq_questions = [q for q in questions if "faq" in q]
+    faq_rows = faq_sweep(faq_matches(args.business_id, faq_questions), args.step) if faq_questions else []
+    best_faq = recommend_faq(faq_rows, args.max_wrong)
+
+    config = load_business_config(args.business_id)
+    print(json.dumps({
+        "questions": len(questions),
+        "answerable": sum(1 for q in questions if q["answerable"]),
+        "ungated": sum(1 for s in scores if s is None),
+        "current": config.get("retrieval_gate"),
+        "recommended": best,
+        "sweep": rows,
+        "faq": {
+            "questions": len(faq_questions),
+            "current": config.get("faq"),
+            "recommended": best_faq,
+            "sweep": faq_rows,
+        },
+    }, indent=2))
+
+    if args.write:
+        if best is None:
+            raise SystemExit("No threshold keeps answer loss within --max-loss; nothing written.")
+        write_threshold(args.business_id, best["threshold"])
+        print(f"✅ retrieval_gate.min_similarity = {best['threshold']} written for {args.business_id}")
+        if best_faq is not None:
+            write_threshold(args.business_id, best_faq["threshold"], block="faq")
+            print(f"✅ faq.min_similarity = {best_faq['threshold']} written for {args.business_id}")
+        elif faq_questions:
+            print("[WARN] No FAQ threshold keeps wrong answers within --max-wrong; faq not written")
+
+
+if __name__ == "__main__":
+    main()
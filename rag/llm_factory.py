@@ -1,23 +1,483 @@
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from langchain_groq import ChatGroq
-#from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config import GROQ_API_KEY
+from app.config import GEMINI_API_KEY, GROQ_API_KEY
 
-def get_groq_llm():
+# "groq" for the hosted models, "fake" for a local canned streaming model
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+
+# Hosted providers in order of preference; ones without an API key are skipped
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "groq,gemini")
+
+# Seconds the fake model waits per streamed character (simulated latency)
+FAKE_LLM_SLEEP = float(os.getenv("FAKE_LLM_SLEEP", "0"))
+
+# Whole-call deadline, including hedges and retries
+LLM_DEADLINE_S = float(os.getenv("LLM_DEADLINE_S", "30"))
+
+# Hedge to the next provider once a call is slower than this percentile of
+# the provider's recent latencies (or LLM_HEDGE_DEFAULT_S until it has enough)
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_DEFAULT_S = float(os.getenv("LLM_HEDGE_DEFAULT_S", "3"))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+# Hedges and retries may add at most this fraction of extra calls
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+
+# Consecutive failures that open a provider's circuit, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+
+LLM_POOL_WORKERS = int(os.getenv("LLM_POOL_WORKERS", "16"))
+
+
+class ProvidersUnavailable(Exception):
+    """Every provider's circuit is open."""
+
+
+def get_groq_llm(streaming: bool = False):
     return ChatGroq(
         groq_api_key=GROQ_API_KEY,
         model_name="llama-3.1-8b-instant",
+        temperature=0,
+        streaming=streaming
+    )
+
+def get_gemini_llm(streaming: bool = False):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        google_api_key=GEMINI_API_KEY,
+        model="gemini-1.5-flash",
         temperature=0
     )
 
-# def get_gemini_llm():
-#     return ChatGoogleGenerativeAI(
-#         google_api_key=GEMINI_API_KEY,
-#         model="gemini-1.5-flash",
-#         temperature=0
-#     )
+def get_fake_llm(responses=None, sleep: float | None = None):
+    """Local stand-in that streams a canned answer character by character."""
+    from langchain_core.language_models.fake import FakeStreamingListLLM
+
+    return FakeStreamingListLLM(
+        responses=responses or ["This is a canned answer from the local fake LLM."],
+        sleep=sleep if sleep is not None else (FAKE_LLM_SLEEP or None)
+    )
+
+
+class StubLLM:
+    """
+    Provider stand-in with injected latency and failures, for exercising
+    the pool (hedging, breakers, deadlines) without network calls.
+    """
+
+    def __init__(self, response: str = "Stub answer.", latency_s: float = 0.0,
+                 failure_rate: float = 0.0, seed: int | None = None):
+        self.response = response
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    def _maybe_fail(self):
+        time.sleep(self.latency_s)
+        if self._rng.random() < self.failure_rate:
+            raise RuntimeError("stub provider failure")
+
+    def invoke(self, prompt: str) -> str:
+        self._maybe_fail()
+        return self.response
+
+    def stream(self, prompt: str):
+        self._maybe_fail()
+        for word in self.response.split(" "):
+            yield word + " "
+
+
+class CircuitBreaker:
+    """
+    Closed → open after `failures` consecutive errors; after `reset_s` one
+    trial call is let through (half-open) and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset_s: float = LLM_BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_s:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._consecutive = 0
+
+    def abandon(self):
+        """A trial call was cancelled without an outcome; allow another."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == "half_open" or self._consecutive >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Token bucket: each request earns `ratio` tokens, each hedge/retry spends one."""
+
+    def __init__(self, ratio: float = LLM_RETRY_BUDGET_RATIO, cap: float = 10.0):
+        self.ratio = ratio
+        self.cap = cap
+        self.tokens = cap
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self.tokens = min(self.cap, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Provider:
+    """One LLM backend: cached client instances, a breaker and latency history."""
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=200)
+        self.first_token_latencies = deque(maxlen=200)
+        self.calls = 0
+        self.failures = 0
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, streaming: bool = False):
+        with self._lock:
+            if streaming not in self._clients:
+                self._clients[streaming] = self.factory(streaming)
+            return self._clients[streaming]
+
+    def hedge_delay(self, streaming: bool = False) -> float:
+        # Streams are hedged on time to first token, calls on total time
+        latencies = sorted(self.first_token_latencies if streaming else self.latencies)
+        if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_S
+        return latencies[min(len(latencies) - 1, int(len(latencies) * LLM_HEDGE_PERCENTILE))]
+
+    def _record(self, ok: bool, seconds: float, streaming: bool = False):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                (self.first_token_latencies if streaming else self.latencies).append(seconds)
+            else:
+                self.failures += 1
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def invoke(self, prompt: str):
+        started = time.perf_counter()
+        try:
+            result = self.client().invoke(prompt)
+        except Exception:
+            self._record(False, time.perf_counter() - started)
+            raise
+        self._record(True, time.perf_counter() - started)
+        return result
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "latency_p50_s": latencies[len(latencies) // 2] if latencies else None,
+            "hedge_after_s": round(self.hedge_delay(), 3),
+        }
+
+
+def _text(chunk):
+    # Chat models return messages, plain LLMs return strings
+    return getattr(chunk, "content", chunk)
+
+
+class ProviderPool:
+    """
+    Sends each call to the first provider whose circuit is closed. If it
+    hasn't answered within its hedge delay a second provider is raced
+    against it (first answer wins); a failure moves on to the next provider.
+    Hedges and retries draw on a shared retry budget, and the whole call is
+    bounded by a deadline.
+    """
+
+    def __init__(self, providers: list[Provider], deadline_s: float = LLM_DEADLINE_S,
+                 budget: RetryBudget | None = None, workers: int = LLM_POOL_WORKERS):
+        self.providers = providers
+        self.deadline_s = deadline_s
+        self.budget = budget or RetryBudget()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+        self.hedges = 0
+        self.retries = 0
+        self.timeouts = 0
+
+    def _next_provider(self, candidates: list[Provider]):
+        # Breakers are asked only when a provider is actually about to be
+        # called, so a half-open trial is never claimed and left unused
+        while candidates:
+            provider = candidates.pop(0)
+            if provider.breaker.allow():
+                return provider
+        return None
+
+    def _deadline_exceeded(self, deadline_s: float):
+        self.timeouts += 1
+        return TimeoutError(f"LLM call exceeded its {deadline_s}s deadline")
+
+    def invoke(self, prompt: str, deadline_s: float | None = None):
+        """Return (provider name, raw result) of the first successful call."""
+        deadline_s = deadline_s or self.deadline_s
+        deadline = time.monotonic() + deadline_s
+        self.budget.on_request()
+        candidates = list(self.providers)
+
+        pending = {}
+        last_error = None
+        hedging = True
+
+        def launch() -> bool:
+            provider = self._next_provider(candidates)
+            if provider is None:
+                return False
+            future = self.executor.submit(provider.invoke, prompt)
+            pending[future] = (provider, time.monotonic())
+            return True
+
+        if not launch():
+            raise ProvidersUnavailable("All LLM providers are temporarily unavailable")
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                raise self._deadline_exceeded(deadline_s)
+
+            timeout = deadline - now
+            newest_provider, newest_start = list(pending.values())[-1]
+            hedge_at = newest_start + newest_provider.hedge_delay()
+            if hedging and candidates:
+                timeout = min(timeout, max(0.0, hedge_at - now))
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, _ = pending.pop(future)
+                try:
+                    return provider.name, future.result()
+                except Exception as e:
+                    print(f"[WARN] LLM provider {provider.name} failed: {e}")
+                    last_error = e
+
+            if not candidates:
+                continue
+            if not pending:
+                # Failed outright: retry on the next provider
+                if not (self.budget.try_spend() and launch()):
+                    break
+                self.retries += 1
+            elif not done and hedging and time.monotonic() >= hedge_at:
+                if self.budget.try_spend() and launch():
+                    self.hedges += 1
+                else:
+                    hedging = False
+
+        raise last_error or self._deadline_exceeded(deadline_s)
+
+    def stream(self, prompt: str, deadline_s: float | None = None):
+        """
+        Yield answer tokens. Hedging races providers to the first token;
+        once one has produced output the others are cancelled and a later
+        failure can no longer switch providers.
+        """
+        deadline_s = deadline_s or self.deadline_s
+        deadline = time.monotonic() + deadline_s
+        self.budget.on_request()
+        candidates = list(self.providers)
+
+        events = queue.Queue()
+        cancels = {}
+        starts = {}
+        last_error = None
+        hedging = True
+
+        def launch() -> bool:
+            provider = self._next_provider(candidates)
+            if provider is None:
+                return False
+            cancel = threading.Event()
+            cancels[provider.name] = cancel
+            starts[provider.name] = (provider, time.monotonic())
+            self.executor.submit(self._stream_worker, provider, prompt, events, cancel)
+            return True
+
+        if not launch():
+            raise ProvidersUnavailable("All LLM providers are temporarily unavailable")
+
+        winner = None
+        while True:
+            now = time.monotonic()
+            if winner is None and now >= deadline:
+                for cancel in cancels.values():
+                    cancel.set()
+                raise self._deadline_exceeded(deadline_s)
+
+            # The deadline bounds time to first token; after that it bounds
+            # the gap between tokens
+            timeout = deadline - now if winner is None else deadline_s
+            hedge_at = None
+            if winner is None and hedging and candidates and starts:
+                provider, started = list(starts.values())[-1]
+                hedge_at = started + provider.hedge_delay(streaming=True)
+                timeout = min(timeout, max(0.0, hedge_at - now))
+
+            try:
+                kind, name, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                if winner is not None:
+                    cancels[winner].set()
+                    raise self._deadline_exceeded(deadline_s)
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    if self.budget.try_spend() and launch():
+                        self.hedges += 1
+                    else:
+                        hedging = False
+                continue
+
+            if winner is not None and name != winner:
+                continue
+
+            if kind == "token":
+                if winner is None:
+                    winner = name
+                    for other, cancel in cancels.items():
+                        if other != name:
+                            cancel.set()
+                yield payload
+            elif kind == "done":
+                return
+            else:
+                starts.pop(name, None)
+                if winner is not None:
+                    raise payload
+                print(f"[WARN] LLM provider {name} failed: {payload}")
+                last_error = payload
+                if starts:
+                    continue
+                if candidates and self.budget.try_spend() and launch():
+                    self.retries += 1
+                    continue
+                raise last_error
+
+    @staticmethod
+    def _stream_worker(provider: Provider, prompt: str, events: queue.Queue, cancel: threading.Event):
+        started = time.perf_counter()
+        first_token = None
+        try:
+            for chunk in provider.client(streaming=True).stream(prompt):
+                if cancel.is_set():
+                    provider.breaker.abandon()
+                    return
+                text = _text(chunk)
+                if text:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    events.put(("token", provider.name, text))
+        except Exception as e:
+            provider._record(False, time.perf_counter() - started)
+            events.put(("error", provider.name, e))
+            return
+        provider._record(True, first_token if first_token is not None else time.perf_counter() - started,
+                         streaming=True)
+        events.put(("done", provider.name, None))
+
+    def stats(self) -> dict:
+        return {
+            "providers": {p.name: p.stats() for p in self.providers},
+            "hedges": self.hedges,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "retry_budget": round(self.budget.tokens, 2),
+        }
+
+
+PROVIDER_FACTORIES = {
+    "groq": (lambda: GROQ_API_KEY, get_groq_llm),
+    "gemini": (lambda: GEMINI_API_KEY, get_gemini_llm),
+}
+
+
+def build_provider_pool() -> ProviderPool:
+    if LLM_PROVIDER == "fake":
+        return ProviderPool([Provider("fake", lambda streaming: get_fake_llm())])
+
+    providers = []
+    for name in [n.strip() for n in LLM_PROVIDERS.split(",") if n.strip()]:
+        api_key, factory = PROVIDER_FACTORIES[name]
+        if api_key():
+            providers.append(Provider(name, factory))
+    if not providers:
+        # Keep the old behaviour: let the Groq client report the missing key
+        providers.append(Provider("groq", get_groq_llm))
+    return ProviderPool(providers)
+
+
+def stub_pool(*specs: dict, **pool_kwargs) -> ProviderPool:
+    """Pool of StubLLM providers, e.g. stub_pool({"latency_s": 2}, {"failure_rate": 0.5})."""
+    return ProviderPool(
+        [Provider(f"stub{i}", lambda streaming, s=spec: StubLLM(**s)) for i, spec in enumerate(specs)],
+        **pool_kwargs
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_provider_pool() -> ProviderPool:
+    """Process-wide pool; clients are created once and reused across requests."""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = build_provider_pool()
+    return _pool
+
 
-def get_primary_llm():
-    return get_groq_llm()
+def set_provider_pool(pool: ProviderPool | None):
+    """Replace the pool (None rebuilds it from config on next use)."""
+    global _pool
 
-def get_fallback_llm():
-    return None
+    with _pool_lock:
+        _pool = pool
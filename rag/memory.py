@@ -0,0 +1,176 @@
+import os
+import re
+from collections import deque
+from app.config import BUSINESS_ID
+from rag.context import estimate_tokens
+from rag.coordinator import Overloaded, get_coordinator
+from rag.prompts import CONDENSE_PROMPT, SUMMARY_PROMPT
+from utils.tracing import span
+
+# Tokens of conversation (rolling summary + recent turns) a follow-up is
+# condensed against; the summary gets at most a third of it
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "400"))
+
+# Messages kept verbatim; older ones are folded into the rolling summary
+MEMORY_RECENT_MESSAGES = int(os.getenv("MEMORY_RECENT_MESSAGES", "6"))
+
+# Messages kept per session for display
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "200"))
+
+# Words that usually point back at earlier turns
+_REFERRING = re.compile(
+    r"\b(it|its|that|those|these|this|they|them|their|ones?|same|other|else|also|instead)\b"
+    r"|^(and|or|but|what about|how about)\b"
+)
+
+# Questions this short are read as follow-ups even without a referring word
+_SHORT_QUESTION_WORDS = 4
+
+
+def _clip(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def _complete(business_id: str, prompt: str) -> str:
+    """
+    One LLM call through the same path as answer generation: the tenant's
+    fair share of coordinator slots (shed with Overloaded when full) and the
+    provider pool's deadline.
+    """
+    from rag.llm_factory import get_provider_pool
+
+    def call():
+        _, result = get_provider_pool().invoke(prompt)
+        return getattr(result, "content", result).strip()
+
+    return get_coordinator().run(business_id, ("memory", prompt), call)
+
+
+def needs_context(question: str) -> bool:
+    """Cheap check for follow-ups; standalone questions skip condensation."""
+    text = question.lower()
+    return len(text.split()) <= _SHORT_QUESTION_WORDS or bool(_REFERRING.search(text))
+
+
+class ConversationMemory:
+    """
+    Chat history for one session.
+
+    `messages` is what the UI shows, capped at `max_messages`. For
+    retrieval, follow-ups are rewritten into standalone questions against a
+    token-bounded window: a rolling summary of older turns plus the most
+    recent messages. Each message is folded into the summary once and each
+    question is condensed once, so reruns do not repeat LLM calls.
+    Overloaded propagates, so a shed rewrite is retried on the next turn.
+    """
+
+    def __init__(self, business_id: str = BUSINESS_ID, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 recent_messages: int = MEMORY_RECENT_MESSAGES,
+                 max_messages: int = HISTORY_MAX_MESSAGES, complete=None):
+        self.business_id = business_id
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        self.messages = deque(maxlen=max_messages)
+        self.summary = ""
+        self.total = 0
+        self._summarized = 0
+        self._condensed = {}
+        self._complete = complete or (lambda prompt: _complete(self.business_id, prompt))
+
+    def add(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content})
+        self.total += 1
+
+    def _older(self) -> list[dict]:
+        """Messages that left the recent window and are not summarized yet."""
+        first_kept = self.total - len(self.messages)
+        start = max(self._summarized, first_kept)
+        end = self.total - self.recent_messages
+        return [self.messages[i - first_kept] for i in range(start, end)]
+
+    def _fold_summary(self):
+        older = self._older()
+        if not older:
+            return
+
+        # Newest first, so a long run of unsummarized messages still costs
+        # at most one budget's worth of tokens to fold
+        summary_tokens = self.token_budget // 3
+        lines, budget = [], self.token_budget
+        for m in reversed(older):
+            line = f"{m['role']}: {_clip(m['content'], summary_tokens // 2)}"
+            budget -= estimate_tokens(line)
+            if budget < 0:
+                break
+            lines.append(line)
+        turns = "\n".join(lines[::-1])
+        with span("memory_summary", messages=len(older)):
+            try:
+                summary = self._complete(SUMMARY_PROMPT.format(
+                    summary=self.summary or "(none)", turns=turns,
+                    max_words=summary_tokens * 3 // 4
+                ))
+            except Overloaded:
+                raise
+            except Exception as e:
+                # Keep the customer's own questions, which carry most of the context
+                print(f"[WARN] Conversation summary failed: {e}")
+                asked = [m["content"] for m in older if m["role"] == "user"]
+                summary = " ".join([self.summary] + [f"Asked: {q}" for q in asked]).strip()
+        self.summary = _clip(summary, summary_tokens)
+        self._summarized = self.total - self.recent_messages
+
+    def window(self) -> str:
+        """Summary plus the newest messages that fit in the token budget."""
+        self._fold_summary()
+
+        budget = self.token_budget
+        parts = []
+        if self.summary:
+            parts.append(f"Summary: {self.summary}")
+            budget -= estimate_tokens(parts[0])
+
+        recent = []
+        for m in reversed(list(self.messages)[-self.recent_messages:]):
+            line = f"{m['role']}: {_clip(m['content'], self.token_budget // 4)}"
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            recent.append(line)
+            budget -= cost
+        return "\n".join(parts + recent[::-1])
+
+    def condense(self, question: str) -> str:
+        """
+        Standalone version of `question` for retrieval and the answer
+        prompt. Call it before adding the question to the history.
+        """
+        if not self.messages or not needs_context(question):
+            return question
+
+        key = (self.total, question)
+        if key in self._condensed:
+            return self._condensed[key]
+
+        history = self.window()
+        with span("condense", history_tokens=estimate_tokens(history)) as s:
+            try:
+                standalone = self._complete(CONDENSE_PROMPT.format(history=history, question=question))
+            except Overloaded:
+                raise
+            except Exception as e:
+                print(f"[WARN] Query condensation failed: {e}")
+                standalone = ""
+            # A rewrite that lost the question or rambled is not worth using
+            if not standalone or estimate_tokens(standalone) > 4 * estimate_tokens(question) + 40:
+                standalone = question
+            s.set(rewritten=standalone != question)
+
+        self._condensed = {key: standalone}
+        return standalone
+
+    def page(self, pages: int, page_size: int) -> tuple[list[dict], int]:
+        """The newest `pages` pages of messages, and how many older ones are hidden."""
+        shown = list(self.messages)[-pages * page_size:]
+        return shown, len(self.messages) - len(shown)
@@ -1,5 +1,9 @@
 from langchain.prompts import PromptTemplate
 
+# What the prompt tells the model to say when the context cannot answer;
+# also returned directly when retrieval confidence is too low to ask
+NO_ANSWER = "I don't have enough information from the provided documents."
+
 RAG_PROMPT = PromptTemplate(
     input_variables=["context", "question", "role"],
     template="""
@@ -24,3 +28,38 @@ Question:
 Answer clearly and concisely.
 """
 )
+
+CONDENSE_PROMPT = PromptTemplate(
+    input_variables=["history", "question"],
+    template="""
+Rewrite the follow-up question as a standalone question that can be
+understood without the conversation. Keep product names, SKUs, colours and
+other specifics from the conversation. If it is already standalone, return
+it unchanged. Reply with the question only.
+
+Conversation:
+{history}
+
+Follow-up question:
+{question}
+
+Standalone question:
+"""
+)
+
+SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["summary", "turns", "max_words"],
+    template="""
+Update the running summary of a customer conversation with the new turns.
+Keep the products, SKUs, orders and preferences the customer mentioned.
+Reply with the summary only, in at most {max_words} words.
+
+Summary so far:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:
+"""
+)
@@ -0,0 +1,256 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from ingestion.embedder import get_embeddings
+from ingestion.store_format import load_store
+from ingestion.versioning import read_index_version
+from ingestion.keyword_index import KeywordIndex
+from utils.tracing import span
+
+VECTOR_DB_PATH = "vector_db"
+
+# Resident vector stores across all tenants are kept under this budget;
+# 0 disables eviction
+VECTOR_STORE_MEMORY_BUDGET_MB = float(os.getenv("VECTOR_STORE_MEMORY_BUDGET_MB", "1024"))
+
+
+def estimate_store_bytes(vectorstore) -> int:
+    """Rough resident size of a FAISS store: raw vectors plus in-memory chunk text."""
+    index = vectorstore.index
+    vector_bytes = index.ntotal * index.d * 4
+
+    docstore = getattr(vectorstore.docstore, "_dict", {})
+    text_bytes = sum(len(doc.page_content) for doc in docstore.values())
+
+    return vector_bytes + text_bytes
+
+
+def _percentile(values, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class TenantStats:
+    def __init__(self):
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.latencies = deque(maxlen=1000)
+
+    def as_dict(self) -> dict:
+        latencies = list(self.latencies)
+        return {
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "requests": len(latencies),
+            "latency_p50_s": _percentile(latencies, 0.50),
+            "latency_p95_s": _percentile(latencies, 0.95),
+        }
+
+
+class VectorStoreRegistry:
+    """
+    Keeps FAISS stores per (business, access partition) resident for the
+    whole process, shared by every tenant through one embedding model.
+
+    A store is reloaded from disk only when the version stamp written by
+    `ingest_files` differs from the one it was loaded with. When resident
+    stores exceed `memory_budget_bytes`, the least recently used ones are
+    evicted and reloaded on their next query.
+    """
+
+    def __init__(self, base_path: str = VECTOR_DB_PATH,
+                 memory_budget_bytes: int = int(VECTOR_STORE_MEMORY_BUDGET_MB * 1024 * 1024)):
+        self.base_path = base_path
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries = OrderedDict()
+        self._load_locks = {}
+        self._tenants = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._reloads = 0
+        self._evictions = 0
+
+    def _store_path(self, business_id: str, access: str) -> str:
+        return os.path.join(self.base_path, business_id, access)
+
+    def _load_lock(self, key):
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def _tenant(self, business_id: str) -> TenantStats:
+        # Caller holds self._lock
+        return self._tenants.setdefault(business_id, TenantStats())
+
+    def exists(self, business_id: str, access: str) -> bool:
+        return os.path.exists(self._store_path(business_id, access))
+
+    def index_version(self, business_id: str) -> str:
+        """Combined version stamp of every partition of a business."""
+        business_path = os.path.join(self.base_path, business_id)
+        if not os.path.isdir(business_path):
+            return ""
+
+        return "/".join(
+            f"{access}:{read_index_version(os.path.join(business_path, access))}"
+            for access in sorted(os.listdir(business_path))
+            if os.path.isdir(os.path.join(business_path, access))
+        )
+
+    def _cached(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["version"] != version:
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            self._tenant(key[0]).hits += 1
+            return entry
+
+    def _evict_over_budget(self, keep):
+        # Caller holds self._lock
+        if self.memory_budget_bytes <= 0:
+            return
+
+        resident = sum(e["bytes"] for e in self._entries.values())
+        for key in list(self._entries):
+            if resident <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self._entries.pop(key)
+            resident -= entry["bytes"]
+            self._evictions += 1
+            self._tenant(key[0]).evictions += 1
+            print(f"♻️ Evicted vector store {key[0]}/{key[1]} to stay under memory budget")
+
+    def _stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                self._tenant(key[0]).hits += 1
+            return entry
+
+    def get(self, business_id: str, access: str):
+        return self._get_entry(business_id, access)["store"]
+
+    def get_partition(self, business_id: str, access: str):
+        """The (FAISS store, BM25 keyword index) pair of one loaded version."""
+        store, keywords, _ = self.get_versioned_partition(business_id, access)
+        return store, keywords
+
+    def get_versioned_partition(self, business_id: str, access: str):
+        """
+        (FAISS store, BM25 keyword index, version) of the partition actually
+        served, which is the previous version while another thread reloads.
+        """
+        entry = self._get_entry(business_id, access)
+        return entry["store"], entry["keywords"], entry["version"]
+
+    def _get_entry(self, business_id: str, access: str) -> dict:
+        key = (business_id, access)
+        path = self._store_path(business_id, access)
+        version = read_index_version(path)
+
+        entry = self._cached(key, version)
+        if entry is not None:
+            return entry
+
+        # While one thread loads a new version, others keep answering from
+        # the resident previous version instead of queueing behind it
+        load_lock = self._load_lock(key)
+        if not load_lock.acquire(blocking=False):
+            stale = self._stale(key)
+            if stale is not None:
+                return stale
+            load_lock.acquire()
+
+        # Only one thread per partition pays for the reload
+        try:
+            entry = self._cached(key, version)
+            if entry is not None:
+                return entry
+
+            print("📂 Loading vector store from:", path)
+
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Vector store not found: {path}")
+
+            embeddings = get_embeddings()
+            with span("vector_store_load", business_id=business_id, access=access):
+                # Index pages and chunk text are mapped, not unpickled
+                store = load_store(path, embeddings, mmap_index=True)
+
+            # Partitions written before keyword indexing get one built in
+            # memory; sync also covers a keyword file saved a moment apart
+            # from the store by a concurrent ingest
+            keywords = KeywordIndex.load(path) or KeywordIndex()
+            keywords.sync(store)
+
+            entry = {
+                "store": store,
+                "keywords": keywords,
+                "version": version,
+                "bytes": estimate_store_bytes(store),
+            }
+
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._reloads += 1
+                self._tenant(business_id).loads += 1
+                self._evict_over_budget(keep=key)
+
+            print("✅ Vector store loaded, doc count:", store.index.ntotal)
+            return entry
+        finally:
+            load_lock.release()
+
+    def record_latency(self, business_id: str, seconds: float):
+        with self._lock:
+            self._tenant(business_id).latencies.append(seconds)
+
+    def invalidate(self, business_id: str | None = None):
+        with self._lock:
+            if business_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == business_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            tenants = {
+                business_id: {**tenant.as_dict(), "resident_bytes": 0}
+                for business_id, tenant in self._tenants.items()
+            }
+            for (business_id, _), entry in self._entries.items():
+                tenants[business_id]["resident_bytes"] += entry["bytes"]
+
+            return {
+                "hits": self._hits,
+                "reloads": self._reloads,
+                "evictions": self._evictions,
+                "resident_bytes": sum(e["bytes"] for e in self._entries.values()),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "partitions": {
+                    f"{business_id}/{access}": {
+                        "version": entry["version"],
+                        "vectors": entry["store"].index.ntotal,
+                        "bytes": entry["bytes"],
+                    }
+                    for (business_id, access), entry in self._entries.items()
+                },
+                "tenants": tenants,
+            }
+
+
+_registry = VectorStoreRegistry()
+
+
+def get_registry() -> VectorStoreRegistry:
+    return _registry
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.tracing import span
+
+# RERANK=1 rescores a wider candidate set with a local cross-encoder
+RERANK_ENABLED = os.getenv("RERANK", "0") == "1"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# First-stage candidates handed to the cross-encoder
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+
+# Stop scoring new batches once a query's rerank has taken this long
+# (wall-clock, since it is a latency budget)
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "8192"))
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Return the process-wide cross-encoder, loading it on first use."""
+    global _cross_encoder
+
+    if _cross_encoder is None:
+        with _cross_encoder_lock:
+            if _cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+                with span("rerank_model_load", model=RERANK_MODEL_NAME):
+                    _cross_encoder = CrossEncoder(RERANK_MODEL_NAME, max_length=512, device="cpu")
+    return _cross_encoder
+
+
+class Reranker:
+    """
+    Rescores (query, chunk) pairs in batches within a latency budget.
+
+    Candidates arrive in first-stage order and are scored front to back, so
+    when the budget runs out the best first-stage candidates are the ones
+    already rescored; the rest keep their original order behind them.
+    Scores are cached per (query, chunk text).
+    """
+
+    def __init__(self, model=None, batch_size: int = RERANK_BATCH_SIZE,
+                 budget_ms: float = RERANK_BUDGET_MS, cache_size: int = RERANK_CACHE_SIZE):
+        self._model = model
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._model or get_cross_encoder()
+
+    @staticmethod
+    def _key(query: str, text: str):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return (" ".join(query.lower().split()), digest)
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def _store(self, key, score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+
+    def rerank(self, query: str, docs: list, k: int) -> list:
+        started = time.perf_counter()
+        scores = [None] * len(docs)
+        keys = [self._key(query, doc.page_content) for doc in docs]
+
+        pending = []
+        for i, key in enumerate(keys):
+            scores[i] = self._cached(key)
+            if scores[i] is None:
+                pending.append(i)
+
+        with span("rerank", candidates=len(docs), cached=len(docs) - len(pending)) as s:
+            scored_batches = 0
+            slowest_batch = 0.0
+            for offset in range(0, len(pending), self.batch_size):
+                elapsed = time.perf_counter() - started
+                # Don't start a batch that would likely overrun the budget
+                if (elapsed + slowest_batch) * 1000 > self.budget_ms:
+                    break
+
+                batch = pending[offset:offset + self.batch_size]
+                batch_started = time.perf_counter()
+                results = self.model.predict(
+                    [(query, docs[i].page_content) for i in batch],
+                    batch_size=len(batch),
+                    show_progress_bar=False
+                )
+                slowest_batch = max(slowest_batch, time.perf_counter() - batch_started)
+                scored_batches += 1
+
+                for i, score in zip(batch, results):
+                    scores[i] = float(score)
+                    self._store(keys[i], scores[i])
+
+            unscored = sum(score is None for score in scores)
+            s.set(batches=scored_batches, truncated=unscored > 0, unscored=unscored)
+
+        rescored = sorted(
+            (i for i in range(len(docs)) if scores[i] is not None),
+            key=lambda i: scores[i], reverse=True
+        )
+        remaining = [i for i in range(len(docs)) if scores[i] is None]
+        return [docs[i] for i in rescored + remaining][:k]
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    global _reranker
+
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
@@ -1,49 +1,205 @@
 import os
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from ingestion.embedder import get_embeddings  # 🔥 single source of truth
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from ingestion.embedder import get_embeddings
+from ingestion.keyword_index import tokenize
+from app.tenants import business_exists, load_business_config
+from rag.registry import get_registry
+from rag.reranker import RERANK_CANDIDATES, RERANK_ENABLED, get_reranker
+from utils.tracing import span
 
-VECTOR_DB_PATH = "vector_db"
+# Partitions each role may search
+ROLE_PARTITIONS = {
+    "user": ["public"],
+    "admin": ["public", "admin"],
+}
 
-def load_vectorstore(business_id: str):
-    embeddings = get_embeddings()
-    path = os.path.join(VECTOR_DB_PATH, business_id)
+# "hybrid" fuses BM25 and vector rankings, "vector" uses embeddings only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
 
-    print("📂 Loading vector store from:", path)
+# Reciprocal rank fusion constant and candidates taken from each ranking
+RRF_K = 60
+CANDIDATES_PER_K = 4
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Vector store not found: {path}")
+# Default for the business.json "retrieval_gate" block, e.g.
+# "retrieval_gate": {"min_similarity": 0.32}. Questions whose best chunk is
+# less similar than this are answered without an LLM call; unset disables it
+RETRIEVAL_GATE_MIN_SIMILARITY = os.getenv("RETRIEVAL_GATE_MIN_SIMILARITY")
 
-    vs = FAISS.load_local(
-        path,
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
+def load_vectorstore(business_id: str, access: str = "public"):
+    """Return the resident vector store for one access partition of a business."""
+    return get_registry().get(business_id, access)
+
+
+def l2_to_similarity(distance: float) -> float:
+    """Cosine similarity from FAISS's squared L2 distance (embeddings are unit length)."""
+    return 1.0 - float(distance) / 2.0
+
+
+def _vector_ranking(store, embedding, k: int):
+    """(docstore id, cosine similarity) of the k nearest chunks, closest first."""
+    if store.index.ntotal == 0:
+        return []
+
+    query = np.asarray([embedding], dtype="float32")
+    distances, indices = store.index.search(query, min(k, store.index.ntotal))
+    return [
+        (store.index_to_docstore_id[i], l2_to_similarity(d))
+        for d, i in zip(distances[0], indices[0]) if i != -1
+    ]
+
+
+def _code_terms(query: str) -> set:
+    """Query terms shaped like SKUs and codes ("ut-1042", "size_xl", "30")."""
+    return {term for term in tokenize(query) if any(c.isdigit() or c in "-_" for c in term)}
+
+
+def load_min_similarity(business_id: str) -> Optional[float]:
+    gate = {}
+    if business_exists(business_id):
+        gate = load_business_config(business_id).get("retrieval_gate", {})
+    value = gate.get("min_similarity", RETRIEVAL_GATE_MIN_SIMILARITY)
+    return float(value) if value is not None else None
+
+
+class PartitionedRetriever(BaseRetriever):
+    """
+    Searches each allowed access partition separately and merges the
+    results, so every partition contributes a full candidate list and user
+    queries never score admin chunks.
+
+    In hybrid mode each partition contributes a vector ranking and a BM25
+    ranking, fused with reciprocal rank fusion; exact SKU and policy-term
+    matches surface even when the embedding misses them.
+
+    With `rerank` a wider candidate set is retrieved and rescored by a
+    cross-encoder before the top k are returned.
+
+    `min_similarity` is the business's confidence gate, applied by
+    `rag.chain` to the top similarity from `search_with_scores`. A chunk
+    that BM25 ranks first on an exact code from the query (a SKU, an order
+    number) bypasses it, since the embedding often misses those.
+
+    `index_version` stamps the partition versions this retriever searches,
+    in the format of `rag.faq.role_version`, so answers built from it can
+    be told apart from ones built after a re-ingest.
+    """
+
+    partitions: list
+    k: int = 4
+    mode: str = RETRIEVAL_MODE
+    rerank: bool = RERANK_ENABLED
+    min_similarity: Optional[float] = None
+    index_version: Optional[str] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        hits, _ = self.search_with_scores(query)
+        return [doc for doc, _ in hits]
+
+    def search_with_scores(self, query: str):
+        """
+        Return ([(doc, similarity)], top similarity) for the top k chunks.
+
+        Similarity is the cosine similarity of a chunk to the query; it is
+        None for chunks found only by keyword search. The top similarity is
+        the best vector match over all candidates, including ones that did
+        not make the final k. It is None, which the gate never turns away,
+        when a returned chunk is the top keyword hit for a code in the query.
+        """
+        if not self.rerank:
+            hits, top, exact = self._candidates(query, self.k)
+        else:
+            candidates, top, exact = self._candidates(query, max(self.k, RERANK_CANDIDATES))
+            scores = {id(doc): score for doc, score in candidates}
+            reranked = get_reranker().rerank(query, [doc for doc, _ in candidates], self.k)
+            hits = [(doc, scores[id(doc)]) for doc in reranked]
+
+        if any(id(doc) in exact for doc, _ in hits):
+            top = None
+        return hits, top
+
+    def _candidates(self, query: str, k: int) -> Tuple[List[Tuple[Document, Optional[float]]], Optional[float], set]:
+        """(hits, top similarity, ids of hits that are a top keyword match on a query code)."""
+        with span("query_embedding"):
+            embedding = get_embeddings().embed_query(query)
+
+        if self.mode != "hybrid":
+            hits = []
+            with span("vector_search", k=k, partitions=len(self.partitions)):
+                for store, _ in self.partitions:
+                    hits.extend(
+                        (doc, l2_to_similarity(distance))
+                        for doc, distance in store.similarity_search_with_score_by_vector(embedding, k=k)
+                    )
+
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+            return hits[:k], hits[0][1] if hits else None, set()
+
+        fetch_k = k * CANDIDATES_PER_K
+        codes = _code_terms(query)
+        fused = {}
+        similarities = {}
+        exact = set()
+        for store, keywords in self.partitions:
+            with span("vector_search", k=fetch_k):
+                vector_hits = _vector_ranking(store, embedding, fetch_k)
+            with span("keyword_search", k=fetch_k):
+                keyword_ranking = [doc_id for doc_id, _ in keywords.search(query, fetch_k)]
+
+            if keyword_ranking and codes & set(keywords.doc_terms[keyword_ranking[0]]):
+                exact.add((id(store), keyword_ranking[0]))
+
+            for doc_id, similarity in vector_hits:
+                similarities[(id(store), doc_id)] = similarity
+
+            rankings = [[doc_id for doc_id, _ in vector_hits], keyword_ranking]
+            for ranking in rankings:
+                for rank, doc_id in enumerate(ranking):
+                    key = (id(store), doc_id)
+                    score, _ = fused.get(key, (0.0, store))
+                    fused[key] = (score + 1.0 / (RRF_K + rank + 1), store)
+
+        best = sorted(fused.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        hits = []
+        exact_hits = set()
+        for key, (_, store) in best:
+            doc = store.docstore.search(key[1])
+            hits.append((doc, similarities.get(key)))
+            if key in exact:
+                exact_hits.add(id(doc))
+        return hits, max(similarities.values(), default=None), exact_hits
 
-    print("✅ Vector store loaded, doc count:", vs.index.ntotal)
-    return vs
 
 def get_retriever(business_id: str, role: str):
     """
     Get retriever with proper access control.
-    
+
     Role mapping:
-    - 'user' role → can access 'public' documents
-    - 'admin' role → can access both 'public' AND 'admin' documents
+    - 'user' role → searches only the 'public' partition
+    - 'admin' role → searches the 'public' AND 'admin' partitions, merged by score
     """
-    vectorstore = load_vectorstore(business_id)
-
-    # Map user role to document access level
-    if role == "admin":
-        # Admin can see everything - no filter needed
-        return vectorstore.as_retriever(
-            search_kwargs={"k": 4}
-        )
-    else:
-        # Regular users only see public documents
-        return vectorstore.as_retriever(
-            search_kwargs={
-                "k": 4,
-                "filter": {"access": "public"}
-            }
-        )
+    registry = get_registry()
+    partitions = ROLE_PARTITIONS.get(role, ROLE_PARTITIONS["user"])
+
+    # A partition only exists once a document with that access was ingested
+    available = []
+    versions = {}
+    for access in partitions:
+        if registry.exists(business_id, access):
+            store, keywords, versions[access] = registry.get_versioned_partition(business_id, access)
+            available.append((store, keywords))
+    if not available:
+        raise FileNotFoundError(f"Vector store not found for business: {business_id}")
+
+    return PartitionedRetriever(
+        partitions=available, k=4, min_similarity=load_min_similarity(business_id),
+        index_version="/".join(f"{access}:{versions.get(access)}" for access in partitions)
+    )
@@ -0,0 +1,136 @@
+import time
+from rag.cache import get_answer_cache, normalize_query
+from rag.chain import run_rag, stream_rag
+from rag.coordinator import get_coordinator
+from rag.faq import (
+    FAQ_ENABLED, get_faq_store, load_faq_similarity, log_query, refresh_entry, role_version
+)
+from rag.registry import get_registry
+from rag.retriever import get_retriever
+from utils.tracing import span, trace
+
+# Shared by the Streamlit app and the HTTP API. Errors propagate to the
+# caller, which decides how to surface them; `Overloaded` means the request
+# was shed and can be retried.
+
+
+def _cached_answer(business_id: str, role: str, version: str, query: str):
+    with span("cache_lookup") as s:
+        cached = get_answer_cache().get(business_id, role, version, query)
+        s.set(cache_hit=cached is not None)
+    return cached
+
+
+def _faq_match(business_id: str, role: str, query: str):
+    """Nearest precomputed FAQ entry, fresh or stale, or None."""
+    if not FAQ_ENABLED:
+        return None
+    with span("faq_lookup") as s:
+        try:
+            store = get_faq_store(business_id)
+            match = store.lookup(role, query, load_faq_similarity(business_id))
+        except Exception as e:
+            print(f"[WARN] FAQ lookup failed for {business_id}: {e}")
+            match = None
+        s.set(faq_hit=match is not None and not match.stale, faq_stale=bool(match and match.stale))
+    return match
+
+
+def _refresh_faq(business_id: str, match, answer: str, version: str):
+    # Stamped with the partitions the answer was retrieved from: an answer
+    # from a previous version served during a reload stays stale
+    try:
+        refresh_entry(business_id, match, answer, version)
+        print(f"♻️ Regenerated stale FAQ answer: {match.question}")
+    except Exception as e:
+        print(f"[WARN] Could not update FAQ entry '{match.question}': {e}")
+
+
+def _flight_key(business_id: str, role: str, version: str, query: str) -> tuple:
+    return (business_id, role, version, normalize_query(query))
+
+
+def _cache_answer(business_id: str, role: str, version: str, query: str, answer: str,
+                  retriever, started: float):
+    # While a partition reloads, other requests are answered from the
+    # previous version; such an answer must not be cached under the new one
+    if retriever.index_version != role_version(business_id, role):
+        return
+    get_answer_cache().put(business_id, role, version, query, answer, time.perf_counter() - started)
+
+
+def answer_query(business_id: str, role: str, query: str) -> str:
+    with trace("answer", business_id=business_id, role=role, stream=False):
+        version = get_registry().index_version(business_id)
+
+        log_query(business_id, role, query)
+
+        started = time.perf_counter()
+        cached = _cached_answer(business_id, role, version, query)
+        if cached is not None:
+            get_registry().record_latency(business_id, time.perf_counter() - started)
+            return cached
+
+        match = _faq_match(business_id, role, query)
+        if match is not None and not match.stale:
+            get_registry().record_latency(business_id, time.perf_counter() - started)
+            return match.answer
+
+        # A stale FAQ hit regenerates the stored question, so every
+        # paraphrase of it shares one generation and the entry is renewed
+        question = match.question if match is not None else query
+
+        # Keyed by the partitions actually served, so a request on the
+        # previous version never joins a generation on the new one
+        retriever = get_retriever(business_id, role)
+
+        def generate():
+            answer = run_rag(retriever, question, role)
+            _cache_answer(business_id, role, version, query, answer, retriever, started)
+            if match is not None:
+                _refresh_faq(business_id, match, answer, retriever.index_version)
+            return answer
+
+        # Concurrent identical questions wait for one shared generation
+        answer = get_coordinator().run(
+            business_id, _flight_key(business_id, role, retriever.index_version, question), generate
+        )
+        get_registry().record_latency(business_id, time.perf_counter() - started)
+        return answer
+
+
+def stream_answer(business_id: str, role: str, query: str):
+    with trace("answer", business_id=business_id, role=role, stream=True):
+        version = get_registry().index_version(business_id)
+
+        log_query(business_id, role, query)
+
+        started = time.perf_counter()
+        cached = _cached_answer(business_id, role, version, query)
+        if cached is not None:
+            get_registry().record_latency(business_id, time.perf_counter() - started)
+            yield cached
+            return
+
+        match = _faq_match(business_id, role, query)
+        if match is not None and not match.stale:
+            get_registry().record_latency(business_id, time.perf_counter() - started)
+            yield match.answer
+            return
+
+        question = match.question if match is not None else query
+        retriever = get_retriever(business_id, role)
+
+        def generate():
+            answer = ""
+            for token in stream_rag(retriever, question, role):
+                answer += token
+                yield token
+            _cache_answer(business_id, role, version, query, answer, retriever, started)
+            if match is not None:
+                _refresh_faq(business_id, match, answer, retriever.index_version)
+
+        yield from get_coordinator().stream(
+            business_id, _flight_key(business_id, role, retriever.index_version, question), generate
+        )
+        get_registry().record_latency(business_id, time.perf_counter() - started)
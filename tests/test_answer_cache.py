@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_community")
+
+from rag.cache import AnswerCache, entity_tokens
+
+
+def same_vector(query: str):
+    # Every question embeds identically, the worst case for a near-miss
+    return [1.0, 0.0]
+
+
+def _cache(similarity: float) -> AnswerCache:
+    cache = AnswerCache(similarity=similarity, embed_query=same_vector)
+    cache.put("acme", "user", "v1", "Where is order 1234?", "Order 1234 shipped.", 1.0)
+    return cache
+
+
+def test_exact_match_only_by_default():
+    cache = AnswerCache(embed_query=same_vector)
+    cache.put("acme", "user", "v1", "Where is order 1234?", "Order 1234 shipped.", 1.0)
+
+    assert cache.get("acme", "user", "v1", "where is ORDER 1234") == "Order 1234 shipped."
+    assert cache.get("acme", "user", "v1", "Where's my order 1234?") is None
+
+
+def test_semantic_hit_needs_identical_codes():
+    cache = _cache(similarity=0.9)
+
+    assert cache.get("acme", "user", "v1", "Where's my order 1234?") == "Order 1234 shipped."
+    assert cache.get("acme", "user", "v1", "Where is order 5678?") is None
+    assert cache.get("acme", "user", "v1", "Where is order 1234 and 99?") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_entity_tokens():
+    assert entity_tokens("do you have sku ut-jkt-blk in size 32") == {"ut-jkt-blk", "32"}
+    assert entity_tokens("what is your return policy") == frozenset()
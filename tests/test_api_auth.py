@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("langchain_community")
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from api.server import _check_admin, app
+
+client = TestClient(app)
+
+
+def test_admin_access_is_off_without_configured_password(monkeypatch):
+    monkeypatch.delenv("ADMIN_PASSWORD", raising=False)
+
+    assert client.get("/ingest/jobs").status_code == 403
+    assert client.get("/ingest/jobs", headers={"X-Admin-Password": ""}).status_code == 403
+
+    monkeypatch.setenv("ADMIN_PASSWORD", "")
+    assert client.get("/ingest/jobs").status_code == 403
+
+
+def test_admin_requires_matching_header(monkeypatch):
+    monkeypatch.setenv("ADMIN_PASSWORD", "s3cret")
+
+    assert client.get("/ingest/jobs").status_code == 401
+    assert client.get("/ingest/jobs", headers={"X-Admin-Password": "wrong"}).status_code == 401
+
+    _check_admin("admin", "s3cret")
+    _check_admin("user", None)
+    with pytest.raises(HTTPException) as e:
+        _check_admin("admin", None)
+    assert e.value.status_code == 401
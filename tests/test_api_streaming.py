@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("langchain_community")
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import api.server as server
+from api.server import AdmissionController, QueryRequest, app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController(2)
+    monkeypatch.setattr(server, "admission", controller)
+    return controller
+
+
+def _stub_answer(monkeypatch, gate=None):
+    """stream_answer stub yielding three tokens; `gate` holds back the second."""
+    closed = threading.Event()
+
+    def stream_answer(business_id, role, query):
+        try:
+            yield "one "
+            if gate is not None:
+                gate.wait(5)
+            yield "two "
+            yield "three"
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(server, "stream_answer", stream_answer)
+    return closed
+
+
+def _request():
+    return QueryRequest(query="Do you ship abroad?", stream=True)
+
+
+def test_streamed_answer_releases_its_slot(admission, monkeypatch):
+    closed = _stub_answer(monkeypatch)
+
+    response = client.post("/query", json={"query": "Do you ship abroad?", "stream": True})
+
+    assert response.text == "one two three"
+    assert closed.is_set()
+    assert admission.pending == 0
+
+
+def test_never_iterated_body_is_released_by_background_task(admission, monkeypatch):
+    closed = _stub_answer(monkeypatch)
+
+    async def scenario():
+        response = await server.query(_request(), None)
+        assert admission.pending == 1
+        # Client gone before Starlette iterates the body: only the task runs
+        await response.background()
+
+    asyncio.run(scenario())
+    assert closed.is_set()
+    assert admission.pending == 0
+
+
+def test_timed_out_step_keeps_slot_until_worker_finishes(admission, monkeypatch):
+    gate = threading.Event()
+    closed = _stub_answer(monkeypatch, gate)
+    monkeypatch.setattr(server, "API_REQUEST_TIMEOUT_S", 0.2)
+
+    async def scenario():
+        response = await server.query(_request(), None)
+        body = response.body_iterator
+        assert await body.__anext__() == "one "
+        with pytest.raises(asyncio.TimeoutError):
+            await body.__anext__()
+        await response.background()
+
+        # The step blocked on `gate` still owns its worker thread
+        assert admission.pending == 1
+        assert not closed.is_set()
+
+        gate.set()
+        for _ in range(100):
+            if admission.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert closed.is_set()
+    assert admission.pending == 0
+
+
+def test_first_token_timeout_keeps_slot_until_worker_finishes(admission, monkeypatch):
+    gate = threading.Event()
+
+    def stream_answer(business_id, role, query):
+        gate.wait(5)
+        yield "late"
+
+    monkeypatch.setattr(server, "stream_answer", stream_answer)
+    monkeypatch.setattr(server, "API_REQUEST_TIMEOUT_S", 0.1)
+
+    async def scenario():
+        with pytest.raises(HTTPException) as e:
+            await server.query(_request(), None)
+        assert e.value.status_code == 504
+        assert admission.pending == 1
+
+        gate.set()
+        for _ in range(100):
+            if admission.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert admission.pending == 0
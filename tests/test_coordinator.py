@@ -0,0 +1,121 @@
+import threading
+import time
+import pytest
+from rag.coordinator import FairLimiter, Overloaded, RequestCoordinator
+
+
+def _wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_identical_concurrent_runs_compute_once():
+    coordinator = RequestCoordinator(FairLimiter(concurrency=4))
+    release = threading.Event()
+    calls = []
+
+    def answer():
+        calls.append(1)
+        release.wait(2)
+        return "shared answer"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(coordinator.run("acme", ("q",), answer)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_until(lambda: coordinator.coalesced == 9)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["shared answer"] * 10
+    assert len(calls) == 1
+    assert coordinator.computed == 1
+    assert coordinator.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_coalesced_caller():
+    coordinator = RequestCoordinator(FairLimiter(concurrency=1))
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        coordinator.run("acme", ("q",), fail)
+    # The failed flight is forgotten, so the next call computes again
+    assert coordinator.run("acme", ("q",), lambda: "ok") == "ok"
+
+
+def test_tenant_queue_sheds_while_other_tenant_is_admitted():
+    limiter = FairLimiter(concurrency=1, max_queue=10, max_queue_per_tenant=2, timeout_s=2)
+    limiter.acquire("busy")
+    granted = []
+
+    def waiter(tenant):
+        limiter.acquire(tenant)
+        granted.append(tenant)
+
+    threads = [threading.Thread(target=waiter, args=("busy",)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    _wait_until(lambda: limiter.queued == 2)
+
+    with pytest.raises(Overloaded):
+        limiter.acquire("busy")
+    assert limiter.stats()["shed"] == 1
+
+    quiet = threading.Thread(target=waiter, args=("quiet",))
+    quiet.start()
+    threads.append(quiet)
+    _wait_until(lambda: limiter.queued == 3)
+
+    # Slots rotate across tenants instead of draining "busy" first
+    for expected in range(1, 4):
+        limiter.release()
+        _wait_until(lambda: len(granted) == expected)
+    for thread in threads:
+        thread.join()
+    assert granted == ["busy", "quiet", "busy"]
+
+
+def test_queue_timeout_sheds_waiter():
+    limiter = FairLimiter(concurrency=1, timeout_s=0.05)
+    limiter.acquire("acme")
+
+    started = time.monotonic()
+    with pytest.raises(Overloaded, match="Waited"):
+        limiter.acquire("other")
+    assert time.monotonic() - started >= 0.05
+
+    stats = limiter.stats()
+    assert stats["queue_timeouts"] == 1
+    assert stats["queued"] == 0
+    limiter.release()
+    assert limiter.stats()["active"] == 0
+
+
+def test_late_stream_follower_gets_full_replay():
+    coordinator = RequestCoordinator(FairLimiter(concurrency=2))
+    produced = []
+
+    def produce():
+        produced.append(1)
+        yield from ["Free ", "returns ", "within ", "30 days."]
+
+    leader = coordinator.stream("acme", ("q",), produce)
+    assert [next(leader), next(leader)] == ["Free ", "returns "]
+
+    follower = coordinator.stream("acme", ("q",), produce)
+    assert "".join(follower) == "Free returns within 30 days."
+    assert "".join(leader) == "within 30 days."
+
+    assert len(produced) == 1
+    assert coordinator.coalesced == 1
+    assert coordinator.stats()["in_flight"] == 0
+    assert coordinator.limiter.stats()["active"] == 0
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_community")
+
+from rag import faq
+from rag.faq import FaqStore
+from rag.gate_calibration import faq_sweep, recommend_faq
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Every question embeds identically, the worst case for a near-miss
+    monkeypatch.setattr(faq, "embed_normalized", lambda normalized: [1.0, 0.0])
+    store = FaqStore("acme", base_path=str(tmp_path))
+    store.upsert("Do you stock jackets in size 32?", "user", "Yes, size 32 is in stock.", "v1")
+    store.upsert("How long does shipping take?", "user", "Three to five days.", "v1")
+    return store
+
+
+def test_paraphrase_needs_the_same_codes(store):
+    match = store.lookup("user", "Are size 32 jackets in stock?", similarity=0.9)
+    assert match.answer == "Yes, size 32 is in stock."
+
+    assert store.lookup("user", "Are size 34 jackets in stock?", similarity=0.9) is None
+    assert store.lookup("user", "Do you stock jackets in size 32?").similarity == 1.0
+
+
+def test_faq_threshold_recommendation():
+    # (similarity of the nearest entry, was it the right entry)
+    matches = [(0.99, True), (0.96, True), (0.95, False), (0.9, False), None]
+    rows = faq_sweep(matches)
+
+    best = recommend_faq(rows, max_wrong=0.0)
+    assert best["threshold"] == 0.96
+    assert best["faq_answered"] == 0.4
+    assert best["wrong_answers"] == 0.0
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_groq")
+
+from ingestion.versioning import bump_index_version
+from rag import registry as registry_module
+from rag import retriever as retriever_module
+from rag import service
+from rag.cache import AnswerCache
+from rag.faq import role_version
+from rag.registry import VectorStoreRegistry
+
+PARTITION = os.path.join("vector_db", "acme", "public")
+
+
+class FakeKeywords:
+    @classmethod
+    def load(cls, path):
+        return cls()
+
+    def sync(self, store):
+        pass
+
+
+def _store():
+    return SimpleNamespace(index=SimpleNamespace(ntotal=1, d=4), docstore=SimpleNamespace(_dict={}))
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(PARTITION)
+
+    loading, release = threading.Event(), threading.Event()
+    release.set()
+
+    def load_store(path, embeddings, mmap_index=False):
+        loading.set()
+        release.wait(2)
+        return _store()
+
+    registry = VectorStoreRegistry()
+    registry.loading, registry.release = loading, release
+    monkeypatch.setattr(registry_module, "load_store", load_store)
+    monkeypatch.setattr(registry_module, "KeywordIndex", FakeKeywords)
+    monkeypatch.setattr(registry_module, "get_embeddings", lambda: None)
+    monkeypatch.setattr(retriever_module, "get_registry", lambda: registry)
+    monkeypatch.setattr(service, "get_registry", lambda: registry)
+    monkeypatch.setattr(service, "_faq_match", lambda *args: None)
+    return registry
+
+
+def test_answer_from_previous_version_is_not_cached(registry, monkeypatch):
+    cache = AnswerCache(similarity=0)
+    monkeypatch.setattr(service, "get_answer_cache", lambda: cache)
+    answers = iter(["from old documents", "from new documents"])
+    monkeypatch.setattr(service, "run_rag", lambda retriever, question, role: next(answers))
+
+    old = bump_index_version(PARTITION)
+    assert retriever_module.get_retriever("acme", "user").index_version == f"public:{old}"
+
+    # Re-ingest; one thread starts reloading and is held mid-load
+    time.sleep(0.001)
+    new = bump_index_version(PARTITION)
+    registry.loading.clear()
+    registry.release.clear()
+    reload = threading.Thread(target=retriever_module.get_retriever, args=("acme", "user"))
+    reload.start()
+    assert registry.loading.wait(2)
+
+    # A concurrent query is served the previous version...
+    served = retriever_module.get_retriever("acme", "user")
+    assert served.index_version == f"public:{old}"
+    assert role_version("acme", "user") == f"public:{new}"
+    assert service.answer_query("acme", "user", "How long is shipping?") == "from old documents"
+    # ...and its answer is not cached under the new version
+    assert cache.stats()["entries"] == 0
+
+    registry.release.set()
+    reload.join(2)
+
+    assert service.answer_query("acme", "user", "How long is shipping?") == "from new documents"
+    assert cache.stats()["entries"] == 1
+    assert service.answer_query("acme", "user", "How long is shipping?") == "from new documents"
+
+
+def test_stale_faq_refresh_is_stamped_with_the_served_version(registry, monkeypatch):
+    from rag.faq import FaqMatch
+
+    old = bump_index_version(PARTITION)
+    retriever_module.get_retriever("acme", "user")
+
+    match = FaqMatch({"question": "How long is shipping?", "role": "user", "answer": "3 days",
+                      "index_version": "public:older"}, 1.0, stale=True)
+    written = []
+    monkeypatch.setattr(service, "_faq_match", lambda *args: match)
+    monkeypatch.setattr(service, "refresh_entry", lambda business_id, m, answer, version: written.append(version))
+    monkeypatch.setattr(service, "run_rag", lambda retriever, question, role: "regenerated")
+
+    time.sleep(0.001)
+    bump_index_version(PARTITION)
+    registry.loading.clear()
+    registry.release.clear()
+    reload = threading.Thread(target=retriever_module.get_retriever, args=("acme", "user"))
+    reload.start()
+    assert registry.loading.wait(2)
+
+    # Regenerated from the previous version, so the entry stays stale
+    assert service.answer_query("acme", "user", "how long is shipping") == "regenerated"
+    assert written == [f"public:{old}"]
+
+    registry.release.set()
+    reload.join(2)
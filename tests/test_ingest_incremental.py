@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from ingestion import embedding_cache, ingest
+from ingestion.store_format import load_store
+
+BUSINESS_ID = "acme"
+
+
+class FileLike:
+    def __init__(self, path):
+        self.name = path.name
+        self.path = path
+
+    def read(self):
+        return self.path.read_bytes()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(ingest, "PARSE_WORKERS", 1)
+    embeddings = DeterministicFakeEmbedding(size=32)
+    monkeypatch.setattr(ingest, "get_embeddings", lambda: embeddings)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    return docs, embeddings
+
+
+def _write(docs, name, text):
+    path = docs / name
+    path.write_text(text, encoding="utf-8")
+    return FileLike(path)
+
+
+def _texts(embeddings):
+    store = load_store(f"vector_db/{BUSINESS_ID}/public", embeddings)
+    return {
+        store.docstore.search(doc_id).page_content
+        for doc_id in store.index_to_docstore_id.values()
+    }, store
+
+
+def test_successive_ingests_replace_and_prune(workspace):
+    docs, embeddings = workspace
+    shipping = "Shipping takes three to five business days."
+    returns = "Returns are accepted within thirty days of delivery."
+    sizes = "Our jackets run one size small."
+
+    ingest.ingest_files([_write(docs, "shipping.txt", shipping)], BUSINESS_ID, "public")
+    # Second run appends to the partition loaded from disk
+    ingest.ingest_files(
+        [_write(docs, "shipping.txt", shipping), _write(docs, "returns.txt", returns)],
+        BUSINESS_ID, "public"
+    )
+    texts, store = _texts(embeddings)
+    assert texts == {shipping, returns}
+    assert store.similarity_search(returns, k=1)[0].page_content == returns
+
+    # A changed file replaces its old chunks
+    ingest.ingest_files(
+        [_write(docs, "shipping.txt", sizes), _write(docs, "returns.txt", returns)],
+        BUSINESS_ID, "public"
+    )
+    texts, store = _texts(embeddings)
+    assert texts == {sizes, returns}
+    assert store.index.ntotal == 2
+    assert store.similarity_search(sizes, k=1)[0].page_content == sizes
+
+    # Files missing from a pruning sync are purged
+    ingest.ingest_files([_write(docs, "returns.txt", returns)], BUSINESS_ID, "public",
+                        prune_missing=True)
+    texts, store = _texts(embeddings)
+    assert texts == {returns}
+    assert store.similarity_search(returns, k=1)[0].page_content == returns
@@ -0,0 +1,169 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("langchain_groq")
+
+from rag import llm_factory
+from rag.llm_factory import CircuitBreaker, Provider, ProviderPool, RetryBudget
+
+
+class FakeClient:
+    """Scripted provider: fixed latency, optional failure before or mid-stream."""
+
+    def __init__(self, response: str = "ok", latency_s: float = 0.0, fail: bool = False,
+                 fail_after_tokens: int | None = None):
+        self.response = response
+        self.latency_s = latency_s
+        self.fail = fail
+        self.fail_after_tokens = fail_after_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+        if self.fail:
+            raise RuntimeError("provider down")
+
+    def invoke(self, prompt: str) -> str:
+        self._start()
+        return self.response
+
+    def stream(self, prompt: str):
+        self._start()
+        for i, word in enumerate(self.response.split(" ")):
+            if self.fail_after_tokens is not None and i >= self.fail_after_tokens:
+                raise RuntimeError("provider dropped the stream")
+            yield word + " "
+
+
+def _pool(*clients, **kwargs) -> ProviderPool:
+    return ProviderPool(
+        [Provider(f"p{i}", lambda streaming, c=client: c) for i, client in enumerate(clients)],
+        **kwargs
+    )
+
+
+@pytest.fixture(autouse=True)
+def fast_hedge(monkeypatch):
+    monkeypatch.setattr(llm_factory, "LLM_HEDGE_DEFAULT_S", 0.05)
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failures=3, reset_s=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one trial call while half-open
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_reopens_when_trial_fails():
+    breaker = CircuitBreaker(failures=1, reset_s=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_open_breaker_skips_provider():
+    down, up = FakeClient(fail=True), FakeClient("backup")
+    pool = _pool(down, up)
+    pool.providers[0].breaker = CircuitBreaker(failures=2, reset_s=60)
+
+    for _ in range(2):
+        assert pool.invoke("q") == ("p1", "backup")
+    assert pool.providers[0].breaker.state == "open"
+
+    assert pool.invoke("q") == ("p1", "backup")
+    assert down.calls == 2
+
+
+def test_hedge_fires_after_delay_and_first_result_wins():
+    slow, fast = FakeClient("slow", latency_s=0.5), FakeClient("fast")
+    pool = _pool(slow, fast)
+
+    started = time.monotonic()
+    assert pool.invoke("q") == ("p1", "fast")
+    assert time.monotonic() - started < 0.4
+    assert pool.hedges == 1
+    assert slow.calls == 1 and fast.calls == 1
+
+
+def test_no_hedge_before_delay():
+    quick, backup = FakeClient("quick", latency_s=0.01), FakeClient("backup")
+    pool = _pool(quick, backup)
+
+    assert pool.invoke("q") == ("p0", "quick")
+    assert pool.hedges == 0
+    assert backup.calls == 0
+
+
+def test_retry_budget_exhausted():
+    budget = RetryBudget(ratio=0.5, cap=1.0)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.on_request()
+    budget.on_request()
+    assert budget.try_spend()
+
+    down, backup = FakeClient(fail=True), FakeClient("backup")
+    pool = _pool(down, backup, budget=RetryBudget(ratio=0.0, cap=0.0))
+    with pytest.raises(RuntimeError, match="provider down"):
+        pool.invoke("q")
+    assert pool.retries == 0
+    assert backup.calls == 0
+
+
+def test_failure_retries_next_provider_within_budget():
+    down, backup = FakeClient(fail=True), FakeClient("backup")
+    pool = _pool(down, backup)
+
+    assert pool.invoke("q") == ("p1", "backup")
+    assert pool.retries == 1
+
+
+def test_deadline_exceeded():
+    pool = _pool(FakeClient(latency_s=0.5), deadline_s=5)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError, match="0.1s deadline"):
+        pool.invoke("q", deadline_s=0.1)
+    assert time.monotonic() - started < 0.4
+    assert pool.timeouts == 1
+
+
+def test_stream_falls_back_before_first_token():
+    down, backup = FakeClient(fail=True), FakeClient("hello there")
+    pool = _pool(down, backup)
+
+    assert "".join(pool.stream("q")) == "hello there "
+    assert pool.retries == 1
+
+
+def test_stream_does_not_fall_back_after_first_token():
+    flaky, backup = FakeClient("one two three", fail_after_tokens=1), FakeClient("backup")
+    pool = _pool(flaky, backup)
+
+    received = []
+    with pytest.raises(RuntimeError, match="dropped the stream"):
+        for token in pool.stream("q"):
+            received.append(token)
+    assert received == ["one "]
+    assert backup.calls == 0
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("langchain_groq")
+
+from rag import memory
+from rag.coordinator import FairLimiter, Overloaded, RequestCoordinator
+from rag.llm_factory import set_provider_pool, stub_pool
+from rag.memory import ConversationMemory
+
+
+@pytest.fixture
+def conversation():
+    conversation = ConversationMemory("acme")
+    conversation.add("user", "Do you sell rain jackets?")
+    conversation.add("assistant", "Yes, the Storm jacket comes in three colours.")
+    return conversation
+
+
+@pytest.fixture(autouse=True)
+def stub_provider():
+    set_provider_pool(stub_pool({"response": "Which colours does the Storm jacket come in?"}))
+    yield
+    set_provider_pool(None)
+
+
+def test_condense_goes_through_the_coordinator(conversation, monkeypatch):
+    coordinator = RequestCoordinator(FairLimiter(concurrency=1))
+    monkeypatch.setattr(memory, "get_coordinator", lambda: coordinator)
+
+    assert conversation.condense("what colours?") == "Which colours does the Storm jacket come in?"
+    assert coordinator.computed == 1
+    # Cached for the turn, so a rerun makes no second call
+    conversation.condense("what colours?")
+    assert coordinator.computed == 1
+
+
+def test_condense_is_shed_when_overloaded(conversation, monkeypatch):
+    coordinator = RequestCoordinator(FairLimiter(concurrency=0, max_queue=0))
+    monkeypatch.setattr(memory, "get_coordinator", lambda: coordinator)
+
+    with pytest.raises(Overloaded):
+        conversation.condense("what colours?")
+    assert coordinator.limiter.stats()["shed"] == 1
+    assert not conversation._condensed
+
+
+def test_standalone_question_skips_the_llm(conversation, monkeypatch):
+    coordinator = RequestCoordinator(FairLimiter(concurrency=0, max_queue=0))
+    monkeypatch.setattr(memory, "get_coordinator", lambda: coordinator)
+
+    question = "What is your return policy for online orders?"
+    assert conversation.condense(question) == question
@@ -0,0 +1,88 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from ingestion.embedding_backends import QueryBatcher
+
+
+def _wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_concurrent_queries_share_a_batch():
+    batches = []
+
+    def encode(texts):
+        batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    batcher = QueryBatcher(encode, wait_ms=50, max_batch=4)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda t=text: results.__setitem__(t, batcher.embed(t)))
+        for text in ["a", "bb", "ccc", "dddd"]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"a": [1.0], "bb": [2.0], "ccc": [3.0], "dddd": [4.0]}
+    assert len(batches) == 1
+
+
+def test_leader_returns_after_its_own_batch():
+    release = {"a": threading.Event(), "b": threading.Event(), "c": threading.Event()}
+    started = []
+
+    def encode(texts):
+        started.append(texts[0])
+        release[texts[0]].wait(2)
+        return [[1.0] for _ in texts]
+
+    batcher = QueryBatcher(encode, wait_ms=0, max_batch=1)
+    finished = []
+
+    def ask(text):
+        batcher.embed(text)
+        finished.append(text)
+
+    leader = threading.Thread(target=ask, args=("a",))
+    leader.start()
+    _wait_until(lambda: started == ["a"])
+    followers = [threading.Thread(target=ask, args=(t,)) for t in ("b", "c")]
+    for thread in followers:
+        thread.start()
+    _wait_until(lambda: len(batcher._pending) == 2)
+
+    release["a"].set()
+    # "a" is done while "b" is still being embedded by its own caller
+    _wait_until(lambda: started == ["a", "b"])
+    leader.join(1)
+    assert not leader.is_alive()
+    assert finished == ["a"]
+
+    release["b"].set()
+    release["c"].set()
+    for thread in followers:
+        thread.join(2)
+    assert sorted(finished) == ["a", "b", "c"]
+
+
+def test_batch_errors_reach_every_caller():
+    def encode(texts):
+        raise RuntimeError("model failed")
+
+    batcher = QueryBatcher(encode, wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.embed("a")
+    # Leadership was released, so the next query is not stuck
+    with pytest.raises(RuntimeError):
+        batcher.embed("b")
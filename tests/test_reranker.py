@@ -0,0 +1,49 @@
+import time
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+from rag.reranker import Reranker
+
+DOCS = [Document(page_content=f"chunk {i}") for i in range(10)]
+
+
+class SlowModel:
+    """Cross-encoder stand-in: each batch takes `delay_s`, later chunks score higher."""
+
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+        self.batches = []
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        time.sleep(self.delay_s)
+        self.batches.append(len(pairs))
+        return [float(text.split()[-1]) for _, text in pairs]
+
+
+def _names(docs):
+    return [doc.page_content for doc in docs]
+
+
+def test_batches_stop_when_budget_is_spent():
+    model = SlowModel(delay_s=0.05)
+    reranker = Reranker(model=model, batch_size=2, budget_ms=130)
+
+    ranked = reranker.rerank("which chunk?", DOCS, k=10)
+
+    # Two 50 ms batches fit; a third would overrun 130 ms
+    assert model.batches == [2, 2]
+    # Rescored chunks first by score, the rest in first-stage order behind them
+    assert _names(ranked) == _names([DOCS[3], DOCS[2], DOCS[1], DOCS[0]] + DOCS[4:])
+
+
+def test_repeated_query_is_served_from_cache():
+    reranker = Reranker(model=SlowModel(), batch_size=4, budget_ms=1000)
+    first = reranker.rerank("Which chunk?", DOCS, k=5)
+
+    reranker._model = SlowModel()
+    again = reranker.rerank("  which   CHUNK? ", DOCS, k=5)
+
+    assert reranker._model.batches == []
+    assert _names(again) == _names(first) == [f"chunk {i}" for i in range(9, 4, -1)]
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_community")
+
+from langchain_core.documents import Document
+from ingestion.keyword_index import KeywordIndex
+from rag import gate_calibration
+from rag import retriever as retriever_module
+from rag.chain import below_confidence
+from rag.retriever import PartitionedRetriever
+
+CHUNKS = {
+    "returns": "Returns are accepted within 30 days with a receipt.",
+    "sku": "UT-1042 rain jacket: fully waterproof, taped seams.",
+    "care": "Wash jackets cold and hang to dry.",
+}
+# Cosine similarity of each chunk to every query: the embedding misses them all
+SIMILARITY = {"returns": 0.21, "care": 0.18, "sku": 0.05}
+
+
+class FakeIndex:
+    def __init__(self, ids):
+        self.ntotal = len(ids)
+        self.ids = ids
+
+    def search(self, query, k):
+        ranked = sorted(self.ids, key=lambda doc_id: SIMILARITY[doc_id], reverse=True)[:k]
+        # Squared L2 distance between unit vectors
+        distances = [[2.0 * (1.0 - SIMILARITY[doc_id]) for doc_id in ranked]]
+        return np.asarray(distances), np.asarray([[self.ids.index(doc_id) for doc_id in ranked]])
+
+
+@pytest.fixture
+def retriever(monkeypatch):
+    ids = list(CHUNKS)
+    store = SimpleNamespace(
+        index=FakeIndex(ids),
+        index_to_docstore_id=dict(enumerate(ids)),
+        docstore=SimpleNamespace(search=lambda doc_id: Document(page_content=CHUNKS[doc_id])),
+    )
+    keywords = KeywordIndex()
+    for doc_id, text in CHUNKS.items():
+        keywords.add(doc_id, text)
+
+    monkeypatch.setattr(
+        retriever_module, "get_embeddings", lambda: SimpleNamespace(embed_query=lambda q: [0.0])
+    )
+    return PartitionedRetriever(
+        partitions=[(store, keywords)], mode="hybrid", rerank=False, min_similarity=0.5
+    )
+
+
+def test_top_keyword_hit_on_a_code_bypasses_the_gate(retriever):
+    hits, top = retriever.search_with_scores("Is the UT-1042 jacket waterproof?")
+
+    assert top is None
+    assert any("UT-1042" in doc.page_content for doc, _ in hits)
+    assert not below_confidence(retriever, top)
+
+
+def test_plain_keyword_hit_keeps_the_gate(retriever):
+    _, top = retriever.search_with_scores("Do you sell waterproof jetpacks?")
+
+    assert top == pytest.approx(0.21)
+    assert below_confidence(retriever, top)
+
+
+def test_calibration_sweeps_the_served_signal(retriever, monkeypatch):
+    monkeypatch.setattr(gate_calibration, "get_retriever", lambda business_id, role: retriever)
+    questions = [
+        {"question": "Is the UT-1042 jacket waterproof?", "answerable": True},
+        {"question": "Do you sell waterproof jetpacks?", "answerable": False},
+    ]
+
+    scores = gate_calibration.top_similarities("acme", questions)
+    assert scores == [None, pytest.approx(0.21)]
+
+    # No threshold turns the SKU question away, so none loses an answer
+    rows = gate_calibration.sweep(questions, scores)
+    assert all(row["answer_loss"] == 0.0 for row in rows)
+    assert gate_calibration.recommend(rows, max_loss=0.0)["unanswerable_caught"] == 1.0
@@ -0,0 +1,59 @@
+import time
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+from rag import chain
+from rag.chain import STREAM_METRICS, stream_rag
+from rag.llm_factory import get_fake_llm
+from rag.prompts import NO_ANSWER
+
+ANSWER = "Orders ship in 2 days."
+
+
+def _retriever(similarity: float, min_similarity: float | None = None):
+    doc = Document(page_content="Orders ship within two business days.", metadata={"source": "faq.txt"})
+    return SimpleNamespace(
+        k=4,
+        min_similarity=min_similarity,
+        search_with_scores=lambda query: ([(doc, similarity)], similarity),
+    )
+
+
+def test_tokens_arrive_incrementally():
+    llm = get_fake_llm([ANSWER], sleep=0.01)
+    arrivals = []
+
+    for token in stream_rag(_retriever(0.8), "How fast do you ship?", llm=llm):
+        arrivals.append((time.perf_counter(), token))
+
+    tokens = [token for _, token in arrivals]
+    assert "".join(tokens) == ANSWER
+    assert len(tokens) == len(ANSWER)
+    # The first token is out long before the answer is complete
+    assert arrivals[-1][0] - arrivals[0][0] >= 0.01 * (len(ANSWER) - 2)
+
+
+def test_stream_stats_are_recorded():
+    STREAM_METRICS.clear()
+
+    list(stream_rag(_retriever(0.8), "How fast do you ship?", llm=get_fake_llm([ANSWER], sleep=0.005)))
+
+    assert len(STREAM_METRICS) == 1
+    metrics = STREAM_METRICS[-1]
+    assert metrics["tokens"] == len(ANSWER)
+    assert metrics["time_to_first_token_s"] is not None and metrics["time_to_first_token_s"] >= 0
+    assert metrics["tokens_per_s"] > 0
+
+
+def test_gated_question_streams_no_answer_without_llm(monkeypatch):
+    STREAM_METRICS.clear()
+    monkeypatch.setattr(chain, "get_provider_pool", lambda: pytest.fail("LLM must not be called"))
+    llm = SimpleNamespace(stream=lambda prompt: pytest.fail("LLM must not be called"))
+
+    tokens = list(stream_rag(_retriever(0.1, min_similarity=0.5), "Do you sell jetpacks?", llm=llm))
+
+    assert tokens == [NO_ANSWER]
+    assert len(STREAM_METRICS) == 0
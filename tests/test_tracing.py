@@ -0,0 +1,57 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils import tracing
+from utils.tracing import span, trace
+
+_DONE = object()
+
+
+def _answer(collected: list):
+    with trace("answer", stream=True):
+        collected.append(tracing._current_trace.get())
+        for stage in ("retrieval", "llm_first_token", "llm"):
+            with span(stage):
+                yield stage
+
+
+def test_stream_steps_on_many_threads_share_one_trace():
+    collected = []
+    tokens = _answer(collected)
+    context = contextvars.copy_context()
+
+    # Steps may land on either worker thread
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        steps = []
+        while True:
+            token = executor.submit(context.run, next, tokens, _DONE).result()
+            if token is _DONE:
+                break
+            steps.append(token)
+
+        leaked = executor.submit(tracing._current_trace.get).result()
+
+    assert steps == ["retrieval", "llm_first_token", "llm"]
+    assert [s["stage"] for s in collected[0]["spans"]] == steps
+    assert context.run(tracing._current_trace.get) is None
+    assert leaked is None
+
+
+def test_closing_an_unfinished_stream_resets_the_trace():
+    collected = []
+    tokens = _answer(collected)
+    context = contextvars.copy_context()
+
+    assert context.run(next, tokens) == "retrieval"
+    assert context.run(tracing._current_trace.get) is collected[0]
+
+    context.run(tokens.close)
+    assert context.run(tracing._current_trace.get) is None
+    assert tracing._current_trace.get() is None
+
+
+def test_nested_trace_restores_the_outer_one():
+    with trace("outer") as outer:
+        with trace("inner"):
+            pass
+        assert tracing._current_trace.get() is outer.trace
+    assert tracing._current_trace.get() is None
@@ -1,4 +1,10 @@
 import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
 
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".docx"}
 
@@ -10,3 +16,17 @@ def is_allowed_file(filename: str) -> bool:
 def ensure_directory(path: str):
     if not os.path.exists(path):
         os.makedirs(path)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive advisory lock on `path`, shared by every process on the host."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,148 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+# RAG_TRACING=0 turns every span into a shared no-op
+TRACING_ENABLED = os.getenv("RAG_TRACING", "1") != "0"
+
+# When set, every finished request trace is appended here as one JSON line
+TRACE_FILE = os.getenv("RAG_TRACE_FILE")
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_trace_file_lock = threading.Lock()
+
+
+def observe(stage: str, seconds: float):
+    with _histograms_lock:
+        _histograms.setdefault(stage, _Histogram()).observe(seconds)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.trace = _current_trace.get()
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        observe(self.name, seconds)
+        if self.trace is not None:
+            record = {"stage": self.name, "ms": round(seconds * 1000, 3), **self.attrs}
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            self.trace["spans"].append(record)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+def span(name: str, **attrs):
+    """Time one pipeline stage; attach context with `.set(key=value)`."""
+    if not TRACING_ENABLED:
+        return _NOOP
+    return Span(name, attrs)
+
+
+class Trace(Span):
+    """Root span for one request; collects its child spans."""
+
+    def __enter__(self):
+        self.trace = {
+            "trace_id": uuid.uuid4().hex,
+            "name": self.name,
+            "attrs": self.attrs,
+            "spans": [],
+        }
+        # A streamed answer spans many steps; callers that step it from
+        # worker threads run every step in one Context (api/server.py), so
+        # the trace is current for all of them and the token resets here
+        self._token = _current_trace.set(self.trace)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        try:
+            _current_trace.reset(self._token)
+        except ValueError:
+            # Closed outside its context, e.g. an abandoned stream being
+            # garbage collected; that context is gone with the trace
+            pass
+        observe(self.name, seconds)
+
+        self.trace["ms"] = round(seconds * 1000, 3)
+        if exc_type is not None:
+            self.trace["error"] = exc_type.__name__
+        if TRACE_FILE:
+            with _trace_file_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.trace, default=str) + "\n")
+        return False
+
+
+def trace(name: str, **attrs):
+    """Start a request trace; spans opened inside it are recorded on it."""
+    if not TRACING_ENABLED:
+        return _NOOP
+    return Trace(name, attrs)
+
+
+def export_prometheus() -> str:
+    """All stage histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP rag_stage_seconds Time spent in each RAG pipeline stage.",
+        "# TYPE rag_stage_seconds histogram",
+    ]
+    with _histograms_lock:
+        for stage, hist in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                cumulative += count
+                lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'rag_stage_seconds_sum{{stage="{stage}"}} {hist.total:.6f}')
+            lines.append(f'rag_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+    return "\n".join(lines) + "\n"